@@ -18,14 +18,72 @@
 #   4 E O E E E
 #   5 E E E E E
 
+import heapq
+import itertools
+import mmap
+import multiprocessing
+import struct
+from array import array
+from collections import OrderedDict
+from multiprocessing import shared_memory
+
+# best g of a cell that has not been reached yet
+UNREACHED = 2 ** 62
+
+# binary map files: magic, width, height, then the bordered cells of the maze
+# one byte each, exactly as Maze.cells stores them
+MAP_HEADER = struct.Struct("<4sII")
+MAP_MAGIC = b"MAZ1"
+
+# characters that mean an obstacle in text map files, anything else is open
+MAP_OBSTACLES = b"#O1X"
+
 # class for maze
+#
+# the grid is stored as a flat bytearray (1 = obstacle) with a border of
+# obstacles around it, so a move can never leave the grid and needs no bounds
+# check. a cell id is (y + 1) * stride + (x + 1) where stride = width + 2
 class Maze:
     # content is a list of lists
     def __init__(self, content):
-        self.content = content
-        self.width = len(content[0]) # should be 5
-        self.height = len(content) # should be 6
-        self.valid_moves = [(-1, 0), (0, -1), (1, 0), (0, 1)] # left, right, up, down
+        self.setup(len(content[0]), len(content)) # should be 5 and 6
+
+        # start with every cell blocked, then copy the rows inside the border
+        self.cells = bytearray([1]) * (self.stride * (self.height + 2))
+
+        for y, row in enumerate(content):
+            # a short or long row would resize cells and shift every later row
+            if len(row) != self.width:
+                raise ValueError("row %d has %d cells, expected %d" % (y, len(row), self.width))
+
+            first = self.cell_id((0, y))
+            self.cells[first:first + self.width] = bytes(1 if elem else 0 for elem in row)
+
+        self.build_tables()
+
+    # build a maze on top of an existing bordered cell buffer without copying it
+    # cells is any writable or read-only buffer of stride * (height + 2) bytes
+    @classmethod
+    def from_buffer(cls, cells, width, height, move_costs=None):
+        maze = cls.__new__(cls)
+        maze.setup(width, height)
+
+        if move_costs is not None:
+            maze.move_costs = dict(move_costs)
+
+        maze.cells = cells
+        maze.build_tables()
+        return maze
+
+    # path of the read-only map file the cells are mapped from, if any
+    source_path = None
+
+    # set the size, moves and move costs
+    def setup(self, width, height):
+        self.width = width
+        self.height = height
+        self.stride = self.width + 2
+        self.valid_moves = [(-1, 0), (0, -1), (1, 0), (0, 1)] # west, north, east, south
 
         self.move_costs = {
             "west": 2,
@@ -34,9 +92,108 @@ class Maze:
             "south": 1
         }
 
+    # precompute (cell id offset, cost) for each of the valid moves
+    def build_tables(self):
+        move_names = {(-1, 0): "west", (0, -1): "north", (1, 0): "east", (0, 1): "south"}
+
+        self.edges = tuple((move[1] * self.stride + move[0],
+                            self.move_costs[move_names[move]])
+                           for move in self.valid_moves)
+
+    # position is a tuple (x, y)
+    def cell_id(self, position):
+        return (position[1] + 1) * self.stride + position[0] + 1
+
+    # cell is a cell id, returns a tuple (x, y)
+    def position(self, cell):
+        y, x = divmod(cell, self.stride)
+        return (x - 1, y - 1)
+
+    # place (blocked=True) or clear an obstacle at position (x, y)
+    def set_obstacle(self, position, blocked):
+        self.cells[self.cell_id(position)] = 1 if blocked else 0
+
+    # read-only snapshot of the grid as a tuple of row tuples, 1 = obstacle
+    # it is rebuilt from cells on every access, use set_obstacle to change the maze
+    @property
+    def content(self):
+        return tuple(tuple(self.cells[self.cell_id((0, y)):self.cell_id((self.width, y))])
+                     for y in range(self.height))
+
+
+# map files ##################################################################
+#
+# read a maze from a text file with one line per row, obstacles are any of
+# MAP_OBSTACLES (so both "E/O" grids and "0/1" grids work). rows are read one
+# at a time straight into the bordered cell buffer
+def load_text_maze(path):
+    table = bytearray(256)
+
+    for char in MAP_OBSTACLES:
+        table[char] = 1
+
+    cells = bytearray()
+    width = None
+    height = 0
+
+    with open(path, "rb") as file:
+        for line in file:
+            row = line.rstrip(b"\r\n")
+
+            if not row:
+                continue
+
+            if width is None:
+                width = len(row)
+                cells += bytearray([1]) * (width + 2) # top border
+            elif len(row) != width:
+                raise ValueError("row %d of %s has %d cells, expected %d" % (height, path, len(row), width))
+
+            cells.append(1)
+            cells += row.translate(table)
+            cells.append(1)
+            height += 1
+
+    if width is None:
+        raise ValueError("%s has no rows" % path)
+
+    cells += bytearray([1]) * (width + 2) # bottom border
+    return Maze.from_buffer(cells, width, height)
+
+# write a maze as a binary map file
+def save_binary_maze(maze, path):
+    with open(path, "wb") as file:
+        file.write(MAP_HEADER.pack(MAP_MAGIC, maze.width, maze.height))
+        file.write(maze.cells)
+
+# open a binary map file without reading it. the cells are memory-mapped, so
+# opening is instant whatever the size, and every process that opens the same
+# file shares its pages. the maze is read-only unless writable=True, in which
+# case changes stay private to this process and are not written to the file
+def load_binary_maze(path, writable=False):
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY if writable else mmap.ACCESS_READ)
+
+    magic, width, height = MAP_HEADER.unpack_from(mapped)
+    size = (width + 2) * (height + 2)
+
+    if magic != MAP_MAGIC or len(mapped) < MAP_HEADER.size + size:
+        mapped.close()
+        raise ValueError("%s is not a binary map file" % path)
+
+    maze = Maze.from_buffer(memoryview(mapped)[MAP_HEADER.size:MAP_HEADER.size + size], width, height)
+
+    # workers can map the same file instead of copying the cells
+    if not writable:
+        maze.source_path = path
+
+    return maze
+
 
 # general class for other node classes
 class GeneralNode:
+    __slots__ = ("position", "parent")
+
     #positions is a tuple and parent is a referent to another General Node
     def __init__(self, position, parent):
         self.position = position # what position on grid?
@@ -48,6 +205,7 @@ class GeneralNode:
 
 # specialized node class for a-star algorithm
 class AStarNode(GeneralNode):
+    __slots__ = ("g", "h", "f")
     
     # position is a tuple and parent is another AStarNode
     def __init__(self, position, parent):
@@ -67,20 +225,20 @@ def modif_manhattan_dist(position, goal):
     return x_component + y_component
 
 # construct path from start to goal
-# goal node is an astar node
+# parents is an array mapping each cell id to the cell id it was reached from
 # not required but implemented for testing purposes
-def construct_solution(goal_node):
+def construct_solution(maze, parents, goal_cell):
 
     # list that will contain positions
     path = []
 
-    # point to goal node
-    curr_node = goal_node
+    # point to goal cell
+    curr_cell = goal_cell
 
     # move along path
-    while (curr_node is not None):
-        path.append(curr_node.position)
-        curr_node = curr_node.parent
+    while (curr_cell != -1):
+        path.append(maze.position(curr_cell))
+        curr_cell = parents[curr_cell]
     
     # reverse list
     path = path[::-1]
@@ -88,160 +246,1265 @@ def construct_solution(goal_node):
     # return list full of positions along path
     return path
 
+# result of a search
+class SearchResult:
+
+    def __init__(self):
+        self.path = None # list of positions from start to goal, None if not found
+        self.cost = None # total cost of path
+        self.expansion_order = array('i') # cell ids in the order they were expanded
+        self.generated = 0 # number of entries added to the frontier
+        self.peak_frontier = 0 # largest size of the frontier
+
+    # whether a path was found
+    @property
+    def found(self):
+        return self.path is not None
+
+    # number of cells expanded
+    @property
+    def expanded(self):
+        return len(self.expansion_order)
+
+# write the labels of a search into one text buffer, a row per line
+# labels is an array over cell ids as filled in by a_star_search, obstacles are
+# negative. buffer is an optional bytearray to reuse, a new one is made when it
+# is missing or too small. returns a memoryview of the written part
+def render_output(maze, labels, buffer=None):
+
+    # every cell is as wide as the biggest label, at least two characters
+    cell_width = max(2, len(str(max(labels))))
+    row_size = maze.width * (cell_width + 1) + 1
+    size = row_size * maze.height
+
+    if buffer is None or len(buffer) < size:
+        buffer = bytearray(size)
+
+    wall = b"#" * cell_width
+    pos = 0
+
+    for y in range(maze.height):
+        first = maze.cell_id((0, y))
+
+        for label in labels[first:first + maze.width]:
+            buffer[pos:pos + cell_width] = wall if label < 0 else b"%0*d" % (cell_width, label)
+            buffer[pos + cell_width] = 32 # space
+            pos += cell_width + 1
+
+        buffer[pos] = 10 # new line
+        pos += 1
+
+    return memoryview(buffer)[:size]
+
 # displays output
-def display_output(maze):
+# labels is an array over cell ids as filled in by a_star_search
+def display_output(maze, labels):
 
     # print header
     print("A* Search")
     print("------------------")
 
     # print content
-    content = ""
-    for row in maze:
-        for elem in row:
-            if elem is -1:
-                content += "##"
-            elif elem < 10:
-                content += ("0" + str(elem))
+    print(bytes(render_output(maze, labels)).decode("ascii"), end="")
+    print("------------------")
+
+
+# dijkstra over the whole maze from one cell
+# returns an array over cell ids with the cost from source_cell to each cell,
+# or with reverse=True the cost from each cell to source_cell (every move is
+# followed backwards, so north still costs 3 in the direction it is taken)
+def dijkstra_field(maze, source_cell, reverse=False):
+    cells = maze.cells
+    edges = maze.edges
+    heappush = heapq.heappush
+    heappop = heapq.heappop
+
+    # following a move backwards means stepping against its offset
+    if reverse:
+        edges = tuple((-offset, cost) for offset, cost in edges)
+
+    dist = array('q', [UNREACHED]) * len(cells)
+    dist[source_cell] = 0
+    heap = [(0, source_cell)]
+
+    while heap:
+        d, cell = heappop(heap)
+
+        # skip entries that were replaced by a cheaper path
+        if d > dist[cell]:
+            continue
+
+        for offset, cost in edges:
+            new_cell = cell + offset
+
+            if cells[new_cell] or d + cost >= dist[new_cell]:
+                continue
+
+            dist[new_cell] = d + cost
+            heappush(heap, (d + cost, new_cell))
+
+    return dist
+
+# optional precomputed heuristics for a_star_search
+#
+# for goals that are queried often an exact distance field (reverse dijkstra
+# from the goal) is kept, at most capacity of them with least recently used
+# eviction. for other goals ALT landmark bounds are used when num_landmarks > 0,
+# and otherwise the search falls back to modif_manhattan_dist.
+# a goal gets its own field once it has been asked for promote_after times.
+# use counts are kept for the history most recently asked goals only, so a
+# goal that is not asked again for a long time starts counting over
+class HeuristicCache:
+
+    # maze is an object of type Maze
+    # landmarks is an optional list of (x, y) tuples, chosen automatically
+    # (farthest first) when not given
+    # history defaults to 8 * capacity
+    def __init__(self, maze, capacity=8, num_landmarks=0, landmarks=None, promote_after=2,
+                 history=None):
+        self.maze = maze
+        self.capacity = capacity
+        self.promote_after = promote_after
+        self.history = 8 * capacity if history is None else history
+
+        # goal cell -> distance field, most recently used last
+        self.fields = OrderedDict()
+
+        # goal cell -> number of times it was asked for, most recently asked last
+        self.uses = OrderedDict()
+
+        # list of (from landmark, to landmark) distance fields
+        self.landmark_fields = []
+
+        # from landmark fields already computed while picking landmarks
+        self.picked_fields = {}
+
+        if landmarks is None:
+            landmarks = self.pick_landmarks(num_landmarks)
+
+        for position in landmarks:
+            cell = maze.cell_id(position)
+            from_landmark = self.picked_fields.pop(cell, None)
+
+            if from_landmark is None:
+                from_landmark = dijkstra_field(maze, cell)
+
+            self.landmark_fields.append((from_landmark, dijkstra_field(maze, cell, reverse=True)))
+
+    # returns a cell of the largest connected group of open cells, or None if
+    # there are no open cells. every move can be taken both ways, so the cells
+    # reachable from a cell are exactly its group
+    def largest_component_cell(self):
+        cells = self.maze.cells
+        edges = self.maze.edges
+        seen = bytearray(cells) # obstacles and the border count as seen
+        best_cell = None
+        best_size = 0
+
+        for first in range(len(cells)):
+            if seen[first]:
+                continue
+
+            # flood fill the group of first
+            seen[first] = 1
+            stack = [first]
+            size = 0
+
+            while stack:
+                cell = stack.pop()
+                size += 1
+
+                for offset, _ in edges:
+                    if not seen[cell + offset]:
+                        seen[cell + offset] = 1
+                        stack.append(cell + offset)
+
+            if size > best_size:
+                best_size = size
+                best_cell = first
+
+        return best_cell
+
+    # pick landmarks spread over the maze: start from the largest group of
+    # open cells (a landmark in a sealed pocket bounds nothing outside it) and
+    # repeatedly take the reachable cell farthest from the ones already picked
+    def pick_landmarks(self, count):
+        maze = self.maze
+        landmarks = []
+
+        if count <= 0:
+            return landmarks
+
+        cell = self.largest_component_cell()
+
+        if cell is None:
+            return landmarks
+
+        closest = None
+
+        for _ in range(count):
+            landmarks.append(maze.position(cell))
+            dist = dijkstra_field(maze, cell)
+            self.picked_fields[cell] = dist
+
+            if closest is None:
+                closest = dist
             else:
-                content += str(elem)
-                
-            content += " "
+                closest = array('q', map(min, closest, dist))
 
-        content += "\n"
-    
-    print(content, end="")
-    print("------------------")
-    
+            # farthest reachable cell from every landmark so far
+            best = -1
+            for i, d in enumerate(closest):
+                if d != UNREACHED and d > best:
+                    best = d
+                    cell = i
 
+            if best <= 0:
+                break
 
-# a-star algorithm
+        return landmarks
+
+    # exact distance from every cell to goal, computed and cached on demand
+    # goal is a tuple
+    def distance_field(self, goal):
+        goal_cell = self.maze.cell_id(goal)
+        field = self.fields.get(goal_cell)
+
+        if field is not None:
+            self.fields.move_to_end(goal_cell)
+            return field
+
+        field = dijkstra_field(self.maze, goal_cell, reverse=True)
+        self.fields[goal_cell] = field
+
+        # evict least recently used fields
+        while len(self.fields) > self.capacity:
+            self.fields.popitem(last=False)
+
+        return field
+
+    # returns a function from cell id to a lower bound on the cost to goal, or
+    # None when nothing is cached (a_star_search then uses modif_manhattan_dist)
+    # goal is a tuple
+    def heuristic(self, goal):
+        goal_cell = self.maze.cell_id(goal)
+        self.uses[goal_cell] = self.uses.get(goal_cell, 0) + 1
+        self.uses.move_to_end(goal_cell)
+
+        # forget counts of the least recently asked goals
+        while len(self.uses) > self.history:
+            self.uses.popitem(last=False)
+
+        # exact distances
+        if goal_cell in self.fields or self.uses[goal_cell] >= self.promote_after:
+            return self.distance_field(goal).__getitem__
+
+        if not self.landmark_fields:
+            return None
+
+        # landmark bounds, by the triangle inequality for every landmark L
+        #   d(v, goal) >= d(L, goal) - d(L, v)
+        #   d(v, goal) >= d(v, L) - d(goal, L)
+        # terms with an unreachable distance are left out
+        bounds = [(from_landmark, to_landmark, from_landmark[goal_cell], to_landmark[goal_cell])
+                  for from_landmark, to_landmark in self.landmark_fields]
+        stride = self.maze.stride
+        goal_y, goal_x = divmod(goal_cell, stride)
+
+        def landmark_heuristic(cell):
+            # never weaker than modif_manhattan_dist
+            y, x = divmod(cell, stride)
+            y_diff = goal_y - y
+            h = 2 * abs(goal_x - x) + (y_diff if y_diff > 0 else -3 * y_diff)
+
+            for from_landmark, to_landmark, from_to_goal, goal_to in bounds:
+                from_to_cell = from_landmark[cell]
+                cell_to = to_landmark[cell]
+
+                if from_to_goal != UNREACHED and from_to_cell != UNREACHED:
+                    h = max(h, from_to_goal - from_to_cell)
+
+                if cell_to != UNREACHED and goal_to != UNREACHED:
+                    h = max(h, cell_to - goal_to)
+
+            return h
+
+        return landmark_heuristic
+
+
+# one cluster of a HierarchicalMaze, copied out of the maze with a border of
+# walls around it so a search inside the cluster never has to check that it
+# stays in the rectangle. local cell ids work like the cell ids of Maze, on a
+# grid just big enough for the cluster
+class Cluster:
+
+    # maze is an object of type Maze
+    # bounds is (x0, y0, x1, y1) in cell id coordinates (x1, y1 exclusive)
+    def __init__(self, maze, bounds):
+        x0, y0, x1, y1 = bounds
+        self.maze = maze
+        self.x0 = x0
+        self.y0 = y0
+        self.stride = x1 - x0 + 2
+        self.cells = bytearray([1]) * (self.stride * (y1 - y0 + 2))
+
+        for y in range(y0, y1):
+            row = (y - y0 + 1) * self.stride + 1
+            self.cells[row:row + x1 - x0] = maze.cells[y * maze.stride + x0:y * maze.stride + x1]
+
+        # same moves and costs as maze.edges, with offsets for the local grid
+        self.edges = tuple((move[1] * self.stride + move[0], cost)
+                           for move, (_, cost) in zip(maze.valid_moves, maze.edges))
+
+    # local cell id of a cell id of the maze
+    def local(self, cell):
+        y, x = divmod(cell, self.maze.stride)
+        return (y - self.y0 + 1) * self.stride + x - self.x0 + 1
+
+    # cell id of the maze of a local cell id
+    def cell(self, local):
+        y, x = divmod(local, self.stride)
+        return (y + self.y0 - 1) * self.maze.stride + x + self.x0 - 1
+
+    # dijkstra from the local cell id source that never leaves the cluster
+    # returns (dist, parents) arrays over local cell ids. stops early once
+    # every local cell id in targets is reached, if targets is given, and then
+    # only the costs of cells reached before the last target are final.
+    # reverse works as in dijkstra_field
+    def dijkstra(self, source, targets=None, reverse=False):
+        cells = self.cells
+        edges = self.edges
+
+        if reverse:
+            edges = tuple((-offset, cost) for offset, cost in edges)
+
+        remaining = len(targets) if targets is not None else -1
+        dist = array('q', [UNREACHED]) * len(cells)
+        parents = array('q', [-1]) * len(cells)
+        dist[source] = 0
+
+        # move costs are small positive integers, so lists of cells by cost (a
+        # bucket queue) are cheaper than a heap. a cell reached with cost d is
+        # in buckets[d % size], which is enough buckets since no move reaches
+        # further than the largest move cost ahead
+        size = max(cost for _, cost in edges) + 1
+        buckets = [[] for _ in range(size)]
+        buckets[0].append(source)
+        pending = 1
+        d = 0
+
+        while pending and remaining != 0:
+            bucket = buckets[d % size]
+            buckets[d % size] = []
+            pending -= len(bucket)
+
+            for cell in bucket:
+
+                # skip entries that were replaced by a cheaper path
+                if dist[cell] != d:
+                    continue
+
+                if targets is not None and cell in targets:
+                    remaining -= 1
+
+                    if remaining == 0:
+                        break
+
+                for offset, cost in edges:
+                    new_cell = cell + offset
+                    new_d = d + cost
+
+                    if cells[new_cell] or new_d >= dist[new_cell]:
+                        continue
+
+                    dist[new_cell] = new_d
+                    parents[new_cell] = cell
+                    buckets[new_d % size].append(new_cell)
+                    pending += 1
+
+            d += 1
+
+        return (dist, parents)
+
+# hierarchical (HPA*) pathfinding for very large mazes
+#
+# the maze is cut into cluster_size x cluster_size clusters. where two
+# neighbouring clusters share an open border, transition cells are placed on
+# both sides (one in the middle of short openings, one at each end of long
+# ones). the abstract graph links transitions across borders with the cost of
+# that single move and transitions inside a cluster with the cost of the
+# cheapest path that stays in the cluster, so wind costs are respected.
+# a query searches the abstract graph and then refines only the clusters the
+# abstract path goes through. paths are near-optimal, not always optimal.
+# the links inside a cluster are only worked out the first time a search
+# reaches it (lazy=True), so making one is cheap even for huge mazes and
+# clusters no query goes near cost nothing. lazy=False links every cluster
+# up front, for callers who would rather pay once than on early queries
+class HierarchicalMaze:
+
+    # maze is an object of type Maze
+    def __init__(self, maze, cluster_size=16, lazy=True):
+        self.maze = maze
+        self.cluster_size = cluster_size
+
+        # abstract graph: cell id -> list of (cell id, cost)
+        self.graph = {}
+
+        # cluster (cx, cy) -> set of transition cell ids in it
+        self.transitions = {}
+
+        # cluster (cx, cy) -> Cluster, made when a cluster is first searched
+        self.clusters = {}
+
+        # clusters whose transitions are linked to each other
+        self.linked = set()
+
+        self.build_entrances()
+
+        if not lazy:
+            self.build_intra_edges()
+
+    # cluster of a cell id as a tuple (cx, cy)
+    def cluster_of(self, cell):
+        x, y = self.maze.position(cell)
+        return (x // self.cluster_size, y // self.cluster_size)
+
+    # bounds of a cluster in cell id coordinates, as used by Cluster
+    def cluster_bounds(self, cluster):
+        size = self.cluster_size
+        x0 = cluster[0] * size
+        y0 = cluster[1] * size
+        return (x0 + 1, y0 + 1,
+                min(x0 + size, self.maze.width) + 1, min(y0 + size, self.maze.height) + 1)
+
+    # the Cluster for a cluster (cx, cy)
+    def cluster(self, cluster):
+        if cluster not in self.clusters:
+            self.clusters[cluster] = Cluster(self.maze, self.cluster_bounds(cluster))
+
+        return self.clusters[cluster]
+
+    # add an abstract edge
+    def add_edge(self, from_cell, to_cell, cost):
+        self.graph.setdefault(from_cell, []).append((to_cell, cost))
+        self.graph.setdefault(to_cell, [])
+        self.transitions.setdefault(self.cluster_of(from_cell), set()).add(from_cell)
+        self.transitions.setdefault(self.cluster_of(to_cell), set()).add(to_cell)
+
+    # find openings on every cluster border and link them
+    def build_entrances(self):
+        maze = self.maze
+        size = self.cluster_size
+
+        # cost of a single move by its offset
+        move_cost = dict(maze.edges)
+
+        # vertical borders between x - 1 and x, then horizontal ones between
+        # y - 1 and y. each border is a list of (inside cell, outside cell)
+        borders = []
+
+        for x in range(size, maze.width, size):
+            for y0 in range(0, maze.height, size):
+                borders.append([(maze.cell_id((x - 1, y)), maze.cell_id((x, y)))
+                                for y in range(y0, min(y0 + size, maze.height))])
+
+        for y in range(size, maze.height, size):
+            for x0 in range(0, maze.width, size):
+                borders.append([(maze.cell_id((x, y - 1)), maze.cell_id((x, y)))
+                                for x in range(x0, min(x0 + size, maze.width))])
+
+        for border in borders:
+            # split the border into runs of open pairs
+            runs = []
+            run = []
+
+            for pair in border:
+                if maze.cells[pair[0]] or maze.cells[pair[1]]:
+                    if run:
+                        runs.append(run)
+                    run = []
+                else:
+                    run.append(pair)
+
+            if run:
+                runs.append(run)
+
+            for run in runs:
+                if len(run) < 6:
+                    picked = [run[len(run) // 2]]
+                else:
+                    picked = [run[0], run[-1]]
+
+                for inside, outside in picked:
+                    self.add_edge(inside, outside, move_cost[outside - inside])
+                    self.add_edge(outside, inside, move_cost[inside - outside])
+
+    # link the transitions inside one cluster (cx, cy), once
+    #
+    # walking a path backwards swaps every move for its opposite, so going
+    # back costs the same plus (west - east) per column and (north - south)
+    # per row the path moves forward. the cheapest path from b to a is the
+    # cheapest one from a to b walked backwards, and one dijkstra per pair is
+    # enough
+    def link_cluster(self, cluster):
+        if cluster in self.linked:
+            return
+
+        self.linked.add(cluster)
+        maze = self.maze
+        move_cost = dict(zip(maze.valid_moves, (cost for _, cost in maze.edges)))
+        column_cost = move_cost[(-1, 0)] - move_cost[(1, 0)]
+        row_cost = move_cost[(0, -1)] - move_cost[(0, 1)]
+
+        grid = self.cluster(cluster)
+        cells = sorted(self.transitions.get(cluster, ()))
+        local = [grid.local(cell) for cell in cells]
+
+        for i in range(len(cells) - 1):
+            x, y = maze.position(cells[i])
+            dist, _ = grid.dijkstra(local[i], set(local[i + 1:]))
+
+            for j in range(i + 1, len(cells)):
+                if dist[local[j]] == UNREACHED:
+                    continue
+
+                other_x, other_y = maze.position(cells[j])
+                back = dist[local[j]] + column_cost * (other_x - x) + row_cost * (other_y - y)
+                self.graph[cells[i]].append((cells[j], dist[local[j]]))
+                self.graph[cells[j]].append((cells[i], back))
+
+    # link the transitions inside every cluster
+    def build_intra_edges(self):
+        for cluster in self.transitions:
+            self.link_cluster(cluster)
+
+    # search for a path from start to goal (tuples)
+    # with refine=False only the abstract waypoints are returned, which is
+    # much cheaper when the caller only needs the route and its cost
+    # returns (path, cost) or None if no path was found
+    def search(self, start, goal, refine=True):
+        maze = self.maze
+        start_cell = maze.cell_id(start)
+        goal_cell = maze.cell_id(goal)
+
+        if maze.cells[start_cell] or maze.cells[goal_cell]:
+            return None
+
+        # connect start and goal to the transitions of their clusters
+        start_cluster = self.cluster_of(start_cell)
+        goal_cluster = self.cluster_of(goal_cell)
+        start_targets = self.transitions.get(start_cluster, set())
+        goal_targets = self.transitions.get(goal_cluster, set())
+
+        if start_cluster == goal_cluster:
+            start_targets = start_targets | {goal_cell}
+
+        grid = self.cluster(start_cluster)
+        local = {grid.local(cell): cell for cell in start_targets}
+        dist, _ = grid.dijkstra(grid.local(start_cell), set(local))
+        start_edges = [(cell, dist[target]) for target, cell in local.items()
+                       if dist[target] != UNREACHED]
+
+        grid = self.cluster(goal_cluster)
+        local = {grid.local(cell): cell for cell in goal_targets}
+        dist, _ = grid.dijkstra(grid.local(goal_cell), set(local), reverse=True)
+        goal_edges = {cell: dist[target] for target, cell in local.items()
+                      if dist[target] != UNREACHED}
+
+        # a-star over the abstract graph. frontier entries are
+        # (f, -g, count, cell) so ties go to the deeper entry
+        goal_x, goal_y = goal
+        frontier = [(0, 0, 0, start_cell)]
+        push_count = itertools.count(1)
+        best_g = {start_cell: 0}
+        parents = {start_cell: -1}
+        explored = set()
+
+        while frontier:
+            _, g, _, cell = heapq.heappop(frontier)
+            g = -g
+
+            if cell in explored or g > best_g[cell]:
+                continue
+
+            explored.add(cell)
+
+            if cell == goal_cell:
+                break
+
+            # start is joined to its cluster by start_edges already
+            if cell != start_cell:
+                self.link_cluster(self.cluster_of(cell))
+
+            neighbors = self.graph.get(cell, [])
+
+            if cell == start_cell:
+                neighbors = neighbors + start_edges
+
+            if cell in goal_edges:
+                neighbors = neighbors + [(goal_cell, goal_edges[cell])]
+
+            for new_cell, cost in neighbors:
+                new_g = g + cost
+
+                if new_cell in explored or new_g >= best_g.get(new_cell, UNREACHED):
+                    continue
+
+                best_g[new_cell] = new_g
+                parents[new_cell] = cell
+                h = modif_manhattan_dist(maze.position(new_cell), (goal_x, goal_y))
+                heapq.heappush(frontier, (new_g + h, -new_g, next(push_count), new_cell))
+
+        else:
+            return None
+
+        # abstract waypoints from start to goal
+        waypoints = []
+        cell = goal_cell
+
+        while cell != -1:
+            waypoints.append(cell)
+            cell = parents[cell]
+
+        waypoints.reverse()
+
+        if not refine:
+            return ([maze.position(cell) for cell in waypoints], best_g[goal_cell])
+
+        return (self.refine(waypoints), best_g[goal_cell])
+
+    # expand abstract waypoints (cell ids) into a full list of positions
+    def refine(self, waypoints):
+        maze = self.maze
+        move_cost = dict(maze.edges)
+        path = [maze.position(waypoints[0])]
+
+        for from_cell, to_cell in zip(waypoints, waypoints[1:]):
+
+            # neighbouring cells, a single move is the cheapest way across
+            if to_cell - from_cell in move_cost:
+                path.append(maze.position(to_cell))
+                continue
+
+            # both waypoints are in the same cluster, search only that cluster
+            grid = self.cluster(self.cluster_of(from_cell))
+            source = grid.local(from_cell)
+            _, parents = grid.dijkstra(source, {grid.local(to_cell)})
+
+            piece = []
+            cell = grid.local(to_cell)
+
+            while cell != source:
+                piece.append(maze.position(grid.cell(cell)))
+                cell = parents[cell]
+
+            path.extend(reversed(piece))
+
+        return path
+
+
+# incremental planner (D* Lite) for mazes whose obstacles change
+#
+# the search runs backwards from the goal, so g of a cell is its cost to the
+# goal, and its state is kept between calls. when obstacles change only the
+# cells whose cost to the goal is affected are expanded again, and when the
+# agent moves the old keys stay valid through the km offset
+class IncrementalPlanner:
+
+    # maze is an object of type Maze. start and goal are tuples
+    def __init__(self, maze, start, goal):
+        self.maze = maze
+        self.start_cell = maze.cell_id(start)
+        self.goal_cell = maze.cell_id(goal)
+        self.last_start_cell = self.start_cell
+
+        # key offset, grows by h(old start, new start) every time the agent moves
+        self.km = 0
+
+        # number of cells expanded, to see how much work a repair took
+        self.expanded = 0
+
+        # cost to goal and one-step lookahead cost to goal of each cell
+        self.g = array('q', [UNREACHED]) * len(maze.cells)
+        self.rhs = array('q', [UNREACHED]) * len(maze.cells)
+
+        # moves followed backwards, to find the cells that lead into a cell
+        self.reverse_edges = tuple((-offset, cost) for offset, cost in maze.edges)
+
+        # priority queue with lazy deletion. queued maps a cell to its current key
+        self.frontier = []
+        self.queued = {}
+
+        self.rhs[self.goal_cell] = 0
+        self.push(self.goal_cell)
+
+    # lower bound on the cost from the start to cell, same as modif_manhattan_dist
+    def h(self, from_cell, to_cell):
+        from_y, from_x = divmod(from_cell, self.maze.stride)
+        to_y, to_x = divmod(to_cell, self.maze.stride)
+        y_diff = to_y - from_y
+        return 2 * abs(to_x - from_x) + (y_diff if y_diff > 0 else -3 * y_diff)
+
+    # priority of a cell, as a tuple
+    def key(self, cell):
+        k = min(self.g[cell], self.rhs[cell])
+        return (k + self.h(self.start_cell, cell) + self.km, k)
+
+    # (re)queue a cell with its current key
+    def push(self, cell):
+        key = self.key(cell)
+        self.queued[cell] = key
+        heapq.heappush(self.frontier, (key, cell))
+
+    # drop stale entries from the top of the queue
+    def top(self):
+        while self.frontier:
+            key, cell = self.frontier[0]
+
+            if self.queued.get(cell) == key:
+                return self.frontier[0]
+
+            heapq.heappop(self.frontier)
+
+        return None
+
+    # recompute rhs of a cell and queue it if it is inconsistent
+    def update_cell(self, cell):
+        cells = self.maze.cells
+
+        if cell != self.goal_cell:
+            # obstacles (and the border) cannot reach the goal
+            if cells[cell]:
+                best = UNREACHED
+            else:
+                best = UNREACHED
+                g = self.g
+
+                for offset, cost in self.maze.edges:
+                    next_cell = cell + offset
+
+                    if not cells[next_cell] and g[next_cell] + cost < best:
+                        best = g[next_cell] + cost
+
+            self.rhs[cell] = best
+
+        self.queued.pop(cell, None)
+
+        if self.g[cell] != self.rhs[cell]:
+            self.push(cell)
+
+    # cells that can move into cell
+    def predecessors(self, cell):
+        return [cell + offset for offset, _ in self.reverse_edges]
+
+    # expand cells until the start is consistent
+    def compute_shortest_path(self):
+        g = self.g
+        rhs = self.rhs
+        start_cell = self.start_cell
+
+        while True:
+            entry = self.top()
+
+            if entry is None:
+                break
+
+            key_old, cell = entry
+
+            if key_old >= self.key(start_cell) and rhs[start_cell] == g[start_cell]:
+                break
+
+            key_new = self.key(cell)
+            self.expanded += 1
+
+            # key is out of date after the agent moved
+            if key_old < key_new:
+                self.push(cell)
+
+            # overconsistent, cost to goal went down
+            elif g[cell] > rhs[cell]:
+                g[cell] = rhs[cell]
+                del self.queued[cell]
+
+                for pred in self.predecessors(cell):
+                    self.update_cell(pred)
+
+            # underconsistent, cost to goal went up
+            else:
+                g[cell] = UNREACHED
+
+                for pred in self.predecessors(cell) + [cell]:
+                    self.update_cell(pred)
+
+    # the agent moved to position (x, y)
+    def move_start(self, position):
+        self.start_cell = self.maze.cell_id(position)
+        self.km += self.h(self.last_start_cell, self.start_cell)
+        self.last_start_cell = self.start_cell
+
+    # changes is a list of ((x, y), blocked) tuples. the maze is updated and
+    # the cells around each change are queued for repair on the next plan()
+    def update_obstacles(self, changes):
+        maze = self.maze
+
+        for position, blocked in changes:
+            cell = maze.cell_id(position)
+            maze.set_obstacle(position, blocked)
+            self.update_cell(cell)
+
+            for pred in self.predecessors(cell):
+                self.update_cell(pred)
+
+    # repair the search and follow it from the start to the goal
+    # returns (path, cost) or None if the goal cannot be reached
+    def plan(self):
+        self.compute_shortest_path()
+
+        maze = self.maze
+        cells = maze.cells
+        g = self.g
+        cell = self.start_cell
+
+        if g[cell] >= UNREACHED:
+            return None
+
+        path = [maze.position(cell)]
+        cost = 0
+
+        # walk to the neighbour with the cheapest move + cost to goal
+        while cell != self.goal_cell:
+            best = UNREACHED
+            best_move = None
+
+            for offset, move_cost in maze.edges:
+                next_cell = cell + offset
+
+                if not cells[next_cell] and g[next_cell] + move_cost < best:
+                    best = g[next_cell] + move_cost
+                    best_move = (next_cell, move_cost)
+
+            if best_move is None:
+                return None
+
+            cell = best_move[0]
+            cost += best_move[1]
+            path.append(maze.position(cell))
+
+        return (path, cost)
+
+
+# a-star search without any output
 # maze is an object of type Maze. start and goal are tuples
-def a_star_alg(maze, start, goal):
-    
-    # make a copy of maze to keep track of the order in which nodes
-    # are added to the frontier
-    maze_copy = []
-    
-    for row in maze.content:
-        maze_copy.append(row.copy())
-    
-    # replace ones with #
-    for i in range(maze.height):
-        for j in range(maze.width):
-            if maze_copy[i][j] is 1:
-                maze_copy[i][j] = -1
+# labels is an optional array over cell ids that receives the order in which
+# cells are added to the frontier
+# heuristic is an optional function from cell id to estimated cost to goal,
+# for example from HeuristicCache.heuristic. modif_manhattan_dist if None
+# with reopen=True a frontier cell reached again by a cheaper path gets the
+# cheaper g (decrease-key), which changes the later expansion order. with
+# reopen=False the first path to a frontier cell is kept like the original
+# list frontier did, so labels and expansion order match it exactly
+# returns a SearchResult, its path is None if the goal cannot be reached
+def a_star_search(maze, start, goal, labels=None, heuristic=None, reopen=True):
 
-    #initialize vars
-    current_node = None
-    new_position = None
-    new_node = None
+    # local names for the grid and the move table
+    cells = maze.cells
+    edges = maze.edges
+    stride = maze.stride
+    heappush = heapq.heappush
+    heappop = heapq.heappop
+
+    # keep track of the order in which cells are added to the frontier
     num_added_to_frontier = 1
-    new_positions = []
-    children_nodes = []
 
-    # create frontier
-    frontier = []
+    # search statistics
+    result = SearchResult()
+    expand = result.expansion_order.append
+    peak_frontier = 1
 
-    # create explored set
-    explored = []
+    # node state is kept in per-cell arrays instead of node objects.
+    # explored marks closed cells, best_g holds the cheapest g found so far
+    # and parents the cell each cell was reached from
+    explored = bytearray(len(cells))
+    best_g = array('q', [UNREACHED]) * len(cells)
+    parents = array('i', [-1]) * len(cells)
 
-    # add initial state to frontier
-    frontier.append(AStarNode(start, None))
+    # goal in the same shifted coordinates as cell ids
+    goal_cell = maze.cell_id(goal)
+    goal_y, goal_x = divmod(goal_cell, stride)
 
-    # create goal node
-    goal_node = AStarNode(goal, None)
+    # create frontier. it is a binary heap of (f, count, g, cell) entries,
+    # count breaks ties in the order cells were added
+    frontier = []
+    push_count = itertools.count()
+
+    # add initial state to frontier
+    start_cell = maze.cell_id(start)
+    heappush(frontier, (0, next(push_count), 0, start_cell))
+    best_g[start_cell] = 0
 
     # while frontier is not empty
-    while len(frontier) > 0:
+    while frontier:
         
-        # get node with lowest f
-        current_node = frontier[0]
+        # get cell with lowest f
+        _, _, g, current_cell = heappop(frontier)
 
-        for node in frontier:
-            if (node.f < current_node.f):
-                current_node = node
+        # skip entries that were replaced by a cheaper path
+        if explored[current_cell] or g > best_g[current_cell]:
+            continue
 
-        # remove current node from frontier
-        frontier.remove(current_node)
-
-        # add current node to explored set
-        explored.append(current_node)
+        # add current cell to explored set
+        explored[current_cell] = 1
+        expand(current_cell)
 
         # see if we reached goal
-        if current_node == goal_node:
-            display_output(maze_copy)
-            return
+        if current_cell == goal_cell:
+            result.path = construct_solution(maze, parents, goal_cell)
+            result.cost = g
+            break
+
+        # look at adjacent cells: west, north, east and south of current
+        for offset, cost in edges:
+            new_cell = current_cell + offset
 
-        # find adjacent nodes
-        for move in maze.valid_moves:
-            # calculate new position: eithier left, right, up or down from current
-            new_position = (current_node.position[0] + move[0],
-                            current_node.position[1] + move[1])
-            
-            # ensure new position is within bounds
-            if (new_position[0] < 0 or
-                new_position[0] >= maze.width or
-                new_position[1] < 0 or
-                new_position[1] >= maze.height):
+            # ignore obstacles, the border and explored cells
+            if cells[new_cell] or explored[new_cell]:
                 continue
-            
-            # make sure new position is not on an obstacle
-            if (maze.content[ new_position[1] ][ new_position[0] ] is 1):
+
+            # if cell is already in frontier, keep it unless this path is
+            # cheaper. the old entry stays in the heap and is skipped when popped
+            new_g = g + cost
+            old_g = best_g[new_cell]
+
+            if new_g >= old_g or (not reopen and old_g != UNREACHED):
                 continue
 
-            new_positions.append(new_position)
+            best_g[new_cell] = new_g
+            parents[new_cell] = current_cell
+
+            # calculate h
+            if heuristic is None: # same as modif_manhattan_dist
+                y = new_cell // stride
+                x = new_cell - y * stride
+                y_diff = goal_y - y
+                h = 2 * abs(goal_x - x) + (y_diff if y_diff > 0 else -3 * y_diff)
+
+            else:
+                h = heuristic(new_cell)
+
+                # goal cannot be reached from this cell
+                if h >= UNREACHED:
+                    continue
+
+            # add new cell to frontier
+            heappush(frontier, (new_g + h, next(push_count), new_g, new_cell))
+
+            if len(frontier) > peak_frontier:
+                peak_frontier = len(frontier)
+
+            # put label on cell. a cheaper path keeps the old label
+            if old_g == UNREACHED and labels is not None:
+                labels[new_cell] = num_added_to_frontier
+                num_added_to_frontier += 1
+
+    # count includes the start
+    result.generated = next(push_count)
+    result.peak_frontier = peak_frontier
+    return result
+
+# bidirectional a-star search without any output
+#
+# the forward search follows moves from start and the backward search follows
+# them in reverse from goal, so the wind costs keep their direction. both use
+# the average potential p(v) = (h_goal(v) - h_start(v)) / 2, forward with +p
+# and backward with -p, where h_goal is modif_manhattan_dist to goal and
+# h_start is modif_manhattan_dist from start. that keeps both searches
+# consistent, and the best meeting path mu is optimal once
+# top forward key + top backward key >= mu.
+# keys are doubled so everything stays in integers. among equal keys the
+# deeper cell (larger g) goes first: with an almost exact heuristic, open areas
+# are full of cells with equal keys, and first-added ties would expand all of
+# them from both ends instead of heading for the other search
+# arguments and result are the same as a_star_search, the expansion order
+# interleaves both searches
+def bidirectional_search(maze, start, goal, labels=None):
+    cells = maze.cells
+    stride = maze.stride
+    heappush = heapq.heappush
+    heappop = heapq.heappop
+
+    start_cell = maze.cell_id(start)
+    goal_cell = maze.cell_id(goal)
+    start_y, start_x = divmod(start_cell, stride)
+    goal_y, goal_x = divmod(goal_cell, stride)
+
+    result = SearchResult()
+    expand = result.expansion_order.append
+    peak_frontier = 2
+
+    if start_cell == goal_cell:
+        expand(start_cell)
+        result.path = [start]
+        result.cost = 0
+        result.generated = 1
+        result.peak_frontier = 1
+        return result
+
+    # doubled potential of a cell for the forward search
+    def potential(cell):
+        y = cell // stride
+        x = cell - y * stride
+
+        y_diff = goal_y - y
+        to_goal = 2 * abs(goal_x - x) + (y_diff if y_diff > 0 else -3 * y_diff)
+
+        y_diff = y - start_y
+        from_start = 2 * abs(x - start_x) + (y_diff if y_diff > 0 else -3 * y_diff)
+
+        return to_goal - from_start
+
+    # per direction: moves, sign of the potential, best g, parents, explored
+    # and frontier of (key, -g, count, cell) entries
+    sides = []
+
+    for edges, sign, first_cell in ((maze.edges, 1, start_cell),
+                                    (tuple((-offset, cost) for offset, cost in maze.edges), -1, goal_cell)):
+        best_g = array('q', [UNREACHED]) * len(cells)
+        best_g[first_cell] = 0
+        sides.append((edges, sign, best_g, array('i', [-1]) * len(cells), bytearray(len(cells)),
+                      [(sign * potential(first_cell), 0, 0, first_cell)]))
+
+    # potential terms that don't depend on the cell
+    goal_x2 = 2 * goal_x
+    start_x2 = 2 * start_x
+
+    push_count = itertools.count(1)
+    num_added_to_frontier = 1
+
+    # cheapest path found so far and where the two searches met on it
+    mu = UNREACHED
+    meet_cell = -1
+
+    forward_g = sides[0][2]
+    backward_g = sides[1][2]
+    forward_frontier = sides[0][5]
+    backward_frontier = sides[1][5]
+
+    while forward_frontier and backward_frontier:
+
+        # stop when no unexplored path can beat mu
+        if forward_frontier[0][0] + backward_frontier[0][0] >= 2 * mu:
+            break
+
+        # expand the side with the smaller frontier
+        side = sides[0] if len(forward_frontier) <= len(backward_frontier) else sides[1]
+        edges, sign, best_g, parents, explored, frontier = side
+        other_g = backward_g if sign == 1 else forward_g
+
+        _, g, _, current_cell = heappop(frontier)
+        g = -g
+
+        # skip entries that were replaced by a cheaper path
+        if explored[current_cell] or g > best_g[current_cell]:
+            continue
+
+        explored[current_cell] = 1
+        expand(current_cell)
 
-        # look at adjacent nodes
-        for position in new_positions:
-            
-            # create new node
-            new_node = AStarNode(position, None)
+        for offset, cost in edges:
+            new_cell = current_cell + offset
 
-            # if node has already been explored, ignore it
-            if new_node in explored or new_node in frontier:
+            if cells[new_cell] or explored[new_cell]:
                 continue
 
-            # if node is not in frontier
-            else:
-                
-                # determine whether new node is west, north, east, or south of
-                # current node
-                move = (new_node.position[0] - current_node.position[0],
-                        new_node.position[1] - current_node.position[1])
-                
-                # calculage g
-                if (move == (-1, 0)): # we moved west
-                    new_node.g = current_node.g + maze.move_costs["west"]
-
-                elif (move == (0, -1)): # we moved north
-                    new_node.g = current_node.g + maze.move_costs["north"]
-
-                elif (move == (1, 0)): # we moved east
-                    new_node.g = current_node.g + maze.move_costs["east"]
-
-                elif (move == (0, 1)): # we move south
-                    new_node.g = current_node.g + maze.move_costs["south"]
-                
-                # calculate h
-                new_node.h = modif_manhattan_dist(new_node.position, goal)
-
-                # calculate f
-                new_node.f = new_node.g + new_node.h
-
-                # add new node to frontier
-                frontier.append(new_node)
-
-                # put label in copy of maze
-                maze_copy[ new_node.position[1] ][ new_node.position[0] ] = num_added_to_frontier
+            new_g = g + cost
+            old_g = best_g[new_cell]
+
+            if new_g >= old_g:
+                continue
+
+            best_g[new_cell] = new_g
+            parents[new_cell] = current_cell
+
+            # same as potential(new_cell), inlined
+            y = new_cell // stride
+            x2 = 2 * (new_cell - y * stride)
+            y_diff = goal_y - y
+            to_goal = abs(goal_x2 - x2) + (y_diff if y_diff > 0 else -3 * y_diff)
+            y_diff = y - start_y
+            from_start = abs(x2 - start_x2) + (y_diff if y_diff > 0 else -3 * y_diff)
+
+            heappush(frontier, (2 * new_g + sign * (to_goal - from_start), -new_g, next(push_count), new_cell))
+
+            # put label on cell the first time either search reaches it
+            if labels is not None and old_g == UNREACHED and other_g[new_cell] == UNREACHED:
+                labels[new_cell] = num_added_to_frontier
                 num_added_to_frontier += 1
 
-                # new nodes parent is current node
-                new_node.parent = current_node
+            # the two searches meet here
+            if new_g + other_g[new_cell] < mu:
+                mu = new_g + other_g[new_cell]
+                meet_cell = new_cell
+
+        # frontiers only grow while expanding, so checking once is enough
+        if len(forward_frontier) + len(backward_frontier) > peak_frontier:
+            peak_frontier = len(forward_frontier) + len(backward_frontier)
+
+    # count includes start and goal
+    result.generated = next(push_count) + 1
+    result.peak_frontier = peak_frontier
+
+    if meet_cell == -1:
+        return result
+
+    # forward part ends at the meeting cell, backward part starts after it
+    path = construct_solution(maze, sides[0][3], meet_cell)
+    backward_parents = sides[1][3]
+    cell = backward_parents[meet_cell]
+
+    while cell != -1:
+        path.append(maze.position(cell))
+        cell = backward_parents[cell]
+
+    result.path = path
+    result.cost = mu
+    return result
+
+# a-star algorithm
+# maze is an object of type Maze. start and goal are tuples
+# with bidirectional=True the search runs from both ends (bidirectional_search)
+# reopen is passed to a_star_search. it defaults to False here so the printed
+# labels are the same as the original list frontier, pass reopen=True for the
+# decrease-key search (always optimal cost)
+# the labelled grid is printed only when display is True, headless callers
+# skip the labels entirely. returns the SearchResult
+def a_star_alg(maze, start, goal, bidirectional=False, display=True, reopen=False):
+    labels = None
+
+    # keep track of the order in which cells are added to the frontier.
+    # obstacles are labelled -1
+    if display:
+        labels = array('i', [-cell for cell in maze.cells])
+
+    if bidirectional:
+        result = bidirectional_search(maze, start, goal, labels)
+    else:
+        result = a_star_search(maze, start, goal, labels, reopen=reopen)
+
+    # display labels if the goal was reached
+    if display and result.found:
+        display_output(maze, labels)
+
+    return result
+
+# maze used by batch worker processes, attached in _init_batch_worker
+_worker_maze = None
+_worker_memory = None
+
+# runs in each worker process. attaches to the shared cells of the maze,
+# either a shared memory block or the map file the maze was loaded from
+def _init_batch_worker(memory_name, source_path, width, height, move_costs):
+    global _worker_maze, _worker_memory
+
+    if source_path is not None:
+        _worker_maze = load_binary_maze(source_path)
+        _worker_maze.move_costs = dict(move_costs)
+        _worker_maze.build_tables()
+        return
+
+    # the block may be rounded up to a page, only use the cells part of it
+    _worker_memory = shared_memory.SharedMemory(name=memory_name)
+    size = (width + 2) * (height + 2)
+    _worker_maze = Maze.from_buffer(_worker_memory.buf[:size], width, height, move_costs)
+
+# runs one (start, goal) query in a worker process
+def _batch_worker(query):
+    return _path_and_cost(a_star_search(_worker_maze, query[0], query[1]))
+
+# only path and cost of a result are sent back from batch queries
+def _path_and_cost(result):
+    return (result.path, result.cost) if result.found else None
+
+# answers batches of (start, goal) queries over one maze with a pool of worker
+# processes that is started once and reused by every solve() call, so a caller
+# routing agents every tick pays for process startup only once
+# processes is the number of worker processes (all cores if None). the cells of
+# the maze are copied once into shared memory that every worker maps (or the
+# workers map the file the maze was loaded from with load_binary_maze), they
+# are not pickled per task. call close() when done, or use it in a with block
+class BatchPlanner:
+
+    def __init__(self, maze, processes=None):
+        self.maze = maze
+        self.processes = multiprocessing.cpu_count() if processes is None else processes
+        self.memory = None
+        self.pool = None
+
+        # not worth starting processes, solve() runs inline
+        if self.processes <= 1:
+            return
+
+        if maze.source_path is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=len(maze.cells))
+            self.memory.buf[:len(maze.cells)] = maze.cells
+
+        try:
+            self.pool = multiprocessing.Pool(self.processes, _init_batch_worker,
+                                             (self.memory and self.memory.name, maze.source_path,
+                                              maze.width, maze.height, maze.move_costs))
+        except BaseException:
+            self.close()
+            raise
+
+    # copy the cells of the maze to the workers again after obstacles changed
+    # (set_obstacle). workers map the same block, so the next solve() sees them.
+    # mazes loaded from a map file are read-only and need no refresh
+    def refresh(self):
+        if self.memory is not None:
+            self.memory.buf[:len(self.maze.cells)] = self.maze.cells
+
+    # queries is a list of (start, goal) tuples
+    # returns a list with (path, cost) or None for each query, in order
+    def solve(self, queries):
+        queries = list(queries)
+
+        if self.pool is None or len(queries) <= 1:
+            return [_path_and_cost(a_star_search(self.maze, start, goal)) for start, goal in queries]
+
+        # a few chunks per worker keeps them busy without much overhead
+        chunksize = max(1, len(queries) // (self.processes * 4))
+        return self.pool.map(_batch_worker, queries, chunksize)
+
+    # stop the workers and free the shared memory
+    def close(self):
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+
+        if self.memory is not None:
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+# answer many (start, goal) queries over one maze in one go, see BatchPlanner.
+# callers with a batch every tick should keep a BatchPlanner instead so the
+# workers are started only once
+# returns a list with (path, cost) or None for each query, in order
+def a_star_batch(maze, queries, processes=None):
+    queries = list(queries)
+
+    # not worth starting processes
+    if len(queries) <= 1:
+        processes = 1
 
-        # reset everything
-        new_positions.clear()
-        children_nodes.clear()
+    with BatchPlanner(maze, processes) as planner:
+        return planner.solve(queries)
 
 
 
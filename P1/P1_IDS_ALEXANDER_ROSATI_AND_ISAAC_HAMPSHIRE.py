@@ -1,200 +1,697 @@
 #Authors: Alexander Rosati and Isaac Hampshire
-import queue;
+import multiprocessing
+from array import array
+from multiprocessing import shared_memory
+
+import numpy as np # 'pip install numpy' to install this module
+
+#Neighbor moves as (x change, y change, cost), in the order they are scanned
+MOVES = ((-1, 0, 2), (0, -1, 3), (1, 0, 2), (0, 1, 1))
+
+#Iterative deepening search engine over a grid. All search state lives in the
+#object, so several engines can run side by side and importing this module
+#has no side effects
+class IDSSearch:
+
+    #Constructor, walls is a list of (x, y) positions. solid is an optional
+    #existing buffer of width * height wall flags to use instead of a new one
+    def __init__(self, width, height, walls=(), solid=None):
+
+        #The size of the space
+        self.width = width
+        self.height = height
+
+        #Node data is kept in flat arrays indexed by y * width + x, allocated once
+        self.solid = bytearray(width * height) if solid is None else solid #Whether the node is a wall
+        self.state = bytearray(width * height) #The state of the node in the algorithm
+        self.visited_on = array('l', [-1]) * (width * height) #The step this node was scanned on
+        self.depths = array('l', [-1]) * (width * height) #The depth of this node on the path
+        self.costs = array('l', [-1]) * (width * height) #The path cost to reach this node
+        self.parents = array('l', [-1]) * (width * height) #The index of the parent node
+
+        #The pass each node was last written in
+        self.generation = array('L', [0]) * (width * height)
+        self.current_generation = 1
+
+        #Tracks what step the algorithm is on
+        self.step_counter = 0
+
+        #The frontier, a plain list used as a stack
+        self.stack = []
+
+        #The depth limit of the current pass
+        self.depth_limit = 0
+
+        #Nodes visited at the depth limit in the current pass
+        self.cutoff = []
+
+        #Number of nodes visited by run() and expanded by ida_star()
+        self.visits = 0
+        self.expansions = 0
+
+        #Transposition table settings for run(). With the table on, the depth
+        #and cost arrays of the current pass are the table: a node that is
+        #reached again is expanded again only if it improves on the shallowest
+        #depth or the cheapest cost stored for it (they are kept independently)
+        self.use_table = False
+        self.carry_bounds = False
+
+        #Shallowest depth of each node over earlier passes. With the table on a
+        #pass always reaches a node at its shallowest depth, so when bounds are
+        #carried any deeper arrival can be skipped right away. Costs may then
+        #only come from the shallowest paths
+        self.carried_depths = array('l', [-1]) * (width * height)
+
+        #Depths that arrivals are checked against, the carried depths or the
+        #depths of the root part in a parallel pass. None when not used
+        self.depth_bounds = None
+
+        #When a list, scan() appends every newly scanned node to it
+        self.scan_order = None
+
+        #Table counters. cutoffs are arrivals at an already stored node that
+        #did not improve it, each a subtree a search without the table would
+        #have expanded again. updates are arrivals that improved the stored
+        #bounds and were expanded again. carried_cutoffs are arrivals skipped
+        #because an earlier pass reached the node shallower
+        self.table_cutoffs = 0
+        self.table_updates = 0
+        self.carried_cutoffs = 0
+
+        #Create walls
+        for wall in walls:
+            self.set_wall(wall[0], wall[1])
+
+    #Returns the index of the given position within the space
+    def index_of(self, x, y):
+        return y * self.width + x
+
+    #Makes the node at the given position a wall
+    def set_wall(self, x, y):
+        self.solid[self.index_of(x, y)] = 1
+
+    #Returns the state of the node at an index, nodes not touched in the
+    #current pass are empty
+    def get_state(self, index):
+        if (self.generation[index] != self.current_generation):
+            return 0
+
+        return self.state[index]
+
+    #Returns the display value of the given index within the space
+    def get_display(self, x, y):
+        index = self.index_of(x, y)
+        msg = "  "
+
+        if (self.solid[index]):
+            msg = "##"
 
-#Tracks what step the algorithm is on
-step_counter = 0
+        elif (self.get_state(index) == 2):
+            msg = str(self.visited_on[index])
 
-#Returns the display value of the given index within the space
-def get_display(x, y):
-    return str(space[y][x])
+            if (self.visited_on[index] < 10):
+                msg = "0" + msg
 
-#Displays the current state of the space
-def display_space():
-    border_string = ""
+        return msg
 
-    for j in range(0, width):
-            border_string += "--"
+    #Displays the current state of the space
+    def display_space(self):
+        border_string = ""
 
-            if j != width-1:
+        for j in range(0, self.width):
                 border_string += "--"
 
-    print(border_string)
+                if j != self.width-1:
+                    border_string += "--"
 
-    for i in range(0, height):
+        print(border_string)
 
-        row_string = ""
-        for j in range(0, width):
-            row_string += get_display(j, i)
+        for i in range(0, self.height):
 
-            if j != width:
-                row_string += "  "
-        
-        print(row_string)
+            row_string = ""
+            for j in range(0, self.width):
+                row_string += self.get_display(j, i)
 
-    print(border_string)
+                if j != self.width:
+                    row_string += "  "
 
-#Resets all non-wall nodes to empty nodes
-def reset_space():
+            print(row_string)
 
-    for i in range(0,height):
-        for j in range(0,width):
+        print(border_string)
 
-            if (not space[i][j].solid):
-                space[i][j] = Node(False, j, i)
+    #Resets all non-wall nodes to empty nodes. Node state is only valid for the
+    #generation it was written in, so starting a new generation empties every node
+    def reset_space(self):
+        self.current_generation += 1
 
-#Stores the data at a given space, acting as a graph node
-class Node:
+    #Scans the given node position, adding it to the frontier
+    def scan(self, parent, x, y, depth, cost):
 
-    #Constructor
-    def __init__(self, solid, x, y):
-        
-        #Whether the node can be traversed
-        self.solid = solid
+        #If in bounds
+        if ((x >= 0 and x < self.width) and (y >= 0 and y < self.height)):
 
-        #The position of the node
-        self.pos = [x, y]
+            #Get the node from the position
+            index = self.index_of(x, y)
 
-        #The state of the node in the algorithm
-        self.state = 0
+            if (self.solid[index]):
+                return
 
-        #The step this node was visited on
-        self.visited_on = -1
+            node_state = self.get_state(index)
 
-        #The depth of this node on the path
-        self.depth = -1
+            #If the node has been scanned, look it up in the table
+            if (node_state != 0):
+                if (self.use_table):
+                    self.improve(index, parent, depth, cost, node_state)
 
-        #The path cost to reach this node
-        self.cost = -1
+                return
 
-    #String conversion for display
-    def __str__(self):
-        msg = "  "
+            #If an earlier pass reached the node shallower, that arrival will
+            #happen again in this pass
+            if (self.depth_bounds is not None and depth > self.depth_bounds[index] != -1):
+                self.carried_cutoffs += 1
+                return
 
-        if (self.solid):
-            msg = "##"
+            #Mark the node as scanned (placed into the frontier)
+            self.generation[index] = self.current_generation
+            self.state[index] = 1
 
-        elif (self.state == 2):
-            msg = str(self.visited_on)
+            #Set the parent node, depth, and cost
+            self.parents[index] = parent
+            self.depths[index] = depth
+            self.costs[index] = cost
+            self.record_bounds(index)
 
-            if (self.visited_on < 10):
-                msg = "0" + msg
-        
-        return msg
+            #Set step visited on
+            self.visited_on[index] = self.step_counter
+
+            #Add to the stack
+            self.stack.append(index)
 
-    #Compares the priority of this node with another
-    def __lt__(self, other):
-        selfPriority = self.cost
-        otherPriority = other.cost
-        return selfPriority < otherPriority
+            if (self.scan_order is not None):
+                self.scan_order.append(index)
 
-    #Marks this node as scanned by the search algorithm
-    #(Placed into the frontier)
-    def scan(self, parent, depth, cost, step_number):
+            #Increment the step counter
+            self.step_counter += 1
 
-        #Mark state
-        self.state = 1
+    #Updates the table entry of a node reached again, queuing it to be expanded
+    #again if the new depth or cost improves on what is stored
+    def improve(self, index, parent, depth, cost, node_state):
+        if (depth >= self.depths[index] and cost >= self.costs[index]):
+            self.table_cutoffs += 1
+            return
 
-        #Set the parent node, depth, and cost
-        self.parent = parent
-        self.depth = depth
-        self.cost = cost
+        self.table_updates += 1
 
-        #Set step visited on
-        self.visited_on = step_number
-    
-    #Marks this node as visited by the search algorithm
-    def visit(self):
+        #Set the parent node, depth, and cost
+        self.parents[index] = parent
+        self.depths[index] = min(depth, self.depths[index])
+        self.costs[index] = min(cost, self.costs[index])
+        self.record_bounds(index)
+
+        #Still waiting on the stack, it will be expanded with the new values
+        if (node_state == 1):
+            return
+
+        #Mark the node as scanned again and add to the stack
+        self.state[index] = 1
+        self.stack.append(index)
+
+    #Keeps the shallowest depth of a node across passes
+    def record_bounds(self, index):
+        if (self.carry_bounds):
+            if (self.carried_depths[index] == -1 or self.depths[index] < self.carried_depths[index]):
+                self.carried_depths[index] = self.depths[index]
+
+    #Visits the given node, adding new neighbors to the frontier
+    def visit(self, index):
+
+        #Mark the node as visited
+        self.state[index] = 2
+        self.visits += 1
+
+        #If at depth limit, remember the node so a resumed pass can continue from it
+        if (self.depths[index] >= self.depth_limit):
+            self.cutoff.append(index)
+
+        #If not at depth limit
+        else:
+            x = index % self.width
+            y = index // self.width
+            depth = self.depths[index]
+            cost = self.costs[index]
+
+            #Scan neighbors
+            for move in MOVES:
+                self.scan(index, x + move[0], y + move[1], depth+1, cost + move[2])
+
+    #Runs depth passes from start, with the depth limit growing by increment
+    #from first_depth up to max_depth. When resume is set, each pass continues
+    #from the nodes the previous pass stopped at instead of starting over from
+    #the start position. Nodes keep the step they were first scanned on, so
+    #every node is expanded once over the whole search. Resumed passes mark a
+    #different set of nodes than restarted ones, not just a different numbering:
+    #with increment and first_depth at most 2, a resumed search marks exactly
+    #the nodes within depth_limit moves of start (the breadth first set), since
+    #two paths to a grid node differ in length by an even number and a pass
+    #only goes two layers past the nodes it resumes from. A restarted pass
+    #claims nodes in depth first order, so a node first reached by a longer
+    #path is marked too deep and the nodes behind it can be missed. Larger
+    #steps can miss nodes in both modes. When display is set,
+    #each pass is printed with display_space(). table and carry_bounds turn on
+    #the transposition table (see the constructor)
+    def run(self, start, max_depth, increment=1, first_depth=1, resume=False, display=False,
+            table=False, carry_bounds=False):
+        self.depth_limit = first_depth
+        self.cutoff = []
+        self.visits = 0
+        self.reset_space()
+
+        #Start with an empty table
+        self.use_table = table
+        self.carry_bounds = table and carry_bounds
+        self.table_cutoffs = 0
+        self.table_updates = 0
+        self.carried_cutoffs = 0
+
+        if (self.carry_bounds):
+            self.carried_depths = array('l', [-1]) * (self.width * self.height)
+            self.depth_bounds = self.carried_depths
+        else:
+            self.depth_bounds = None
+
+        #Continue until all nodes traversed
+        while (self.depth_limit <= max_depth):
+
+            #Continue from the nodes cut off by the previous pass, in the order
+            #they were cut off
+            if (resume and self.cutoff):
+                self.stack = self.cutoff[::-1]
+
+            #Start over from the start position
+            else:
+
+                #Initialize step counter
+                self.step_counter = 0
+
+                self.stack = []
+                self.scan(-1, start[0], start[1], 0, 0)
+
+            self.cutoff = []
+
+            #Until depth is fully traversed
+            while self.stack:
+
+                #Visit the next node
+                self.visit(self.stack.pop())
+
+            #Display pass results
+            if (display):
+                self.display_space()
+
+            #Increment depth limit
+            self.depth_limit += increment
+
+            #Reset the space, the last pass is kept for display_space()
+            if (not resume and self.depth_limit <= max_depth):
+                self.reset_space()
+
+    #Runs one depth limited pass with the table from any node, the way run()
+    #does from the start position. Returns the scanned nodes as a flat array of
+    #index, depth, cost and parent for each node, in the order they were scanned
+    def run_subtree(self, index, parent, depth, cost, depth_limit):
+        self.depth_limit = depth_limit
+        self.use_table = True
+        self.carry_bounds = False
+        self.reset_space()
+        self.step_counter = 0
+        self.stack = []
+        self.cutoff = []
+        self.scan_order = []
+
+        self.scan(parent, index % self.width, index // self.width, depth, cost)
+
+        while self.stack:
+            self.visit(self.stack.pop())
+
+        #Nodes scanned but not visited were dropped by a shallower arrival
+        result = array('l')
+
+        for index in self.scan_order:
+            if (self.state[index] == 2):
+                result.extend((index, self.depths[index], self.costs[index], self.parents[index]))
+
+        self.scan_order = None
+        return result
+
+    #Runs the same passes as run() with the table on, split across worker
+    #processes. Each pass first searches to split_depth here, then every node
+    #at split_depth is the root of an independent subtree searched by a worker.
+    #Workers share the walls and the depths of this first part through shared
+    #memory and skip nodes the first part reached shallower. Their results are
+    #merged keeping the shallowest arrival of each node and numbered in subtree
+    #order, so display_space() shows the pass as usual
+    def run_parallel(self, start, max_depth, increment=1, first_depth=1, display=False,
+                     processes=None, split_depth=2):
+        size = self.width * self.height
+
+        if (processes is None):
+            processes = multiprocessing.cpu_count()
+
+        #Walls and first part depths are shared with the workers
+        solid_memory = shared_memory.SharedMemory(create=True, size=size)
+        bounds_memory = shared_memory.SharedMemory(create=True, size=size * 4)
+        bounds = bounds_memory.buf[:size * 4].cast('i')
+
+        try:
+            solid_memory.buf[:size] = self.solid
+
+            with multiprocessing.Pool(processes, _init_subtree_worker,
+                                      (solid_memory.name, bounds_memory.name, self.width, self.height)) as pool:
+                self.depth_limit = first_depth
+
+                #Continue until all nodes traversed
+                while (self.depth_limit <= max_depth):
+                    depth_limit = self.depth_limit
+
+                    #Search the first part here, every node cut off at
+                    #split_depth becomes a subtree root
+                    self.run(start, min(split_depth, depth_limit), first_depth=min(split_depth, depth_limit),
+                             table=True)
+
+                    roots = []
+
+                    if (depth_limit > split_depth):
+                        for index in dict.fromkeys(self.cutoff):
+                            roots.append((index, self.parents[index], self.depths[index],
+                                          self.costs[index], depth_limit))
+
+                    if (roots):
+                        bounds[:] = array('i', [self.depths[i] if self.get_state(i) == 2 else -1
+                                                for i in range(size)])
+                        self.merge_subtrees(pool.map(_subtree_worker, roots))
+
+                    #Display pass results
+                    if (display):
+                        self.display_space()
+
+                    #Increment depth limit
+                    self.depth_limit = depth_limit + increment
+
+        finally:
+            bounds.release()
+            solid_memory.close()
+            solid_memory.unlink()
+            bounds_memory.close()
+            bounds_memory.unlink()
+
+    #Merges subtree results from run_subtree() into the current pass. Each node
+    #keeps its shallowest arrival, the first subtree wins ties, and the winners
+    #are numbered in subtree order after the first part
+    def merge_subtrees(self, results):
+
+        #Node index -> (subtree, position in its result) of the winning arrival
+        winners = {}
+        best_depths = {}
+
+        for subtree, result in enumerate(results):
+            for i in range(0, len(result), 4):
+                index = result[i]
+                depth = result[i+1]
+
+                if (self.get_state(index) == 2 and self.depths[index] <= depth):
+                    continue
+
+                if (index not in best_depths or depth < best_depths[index]):
+                    best_depths[index] = depth
+                    winners[index] = (subtree, i)
+
+        for subtree, result in enumerate(results):
+            for i in range(0, len(result), 4):
+                index = result[i]
+
+                if (winners.get(index) != (subtree, i)):
+                    continue
+
+                #Mark the node as visited with the next step
+                self.generation[index] = self.current_generation
+                self.state[index] = 2
+                self.depths[index] = result[i+1]
+                self.costs[index] = result[i+2]
+                self.parents[index] = result[i+3]
+                self.visited_on[index] = self.step_counter
+                self.step_counter += 1
+                self.visits += 1
+
+    #Returns a lower bound on the path cost from index to goal_index. Moving west
+    #or east costs 2, north 3 and south 1, so this is the cost with no walls
+    def cost_bound(self, index, goal_index):
+        x_diff = goal_index % self.width - index % self.width
+        y_diff = goal_index // self.width - index // self.width
+
+        return 2 * abs(x_diff) + (y_diff if y_diff > 0 else -3 * y_diff)
+
+    #IDA* search from start to goal. Each pass is a depth first search that only
+    #follows nodes with cost + cost_bound <= the pass threshold, and the next
+    #threshold is the smallest f that went over it. Only the current path is kept,
+    #so memory stays that of depth first search, and a node reached again in the
+    #same pass at no lower cost is not searched twice. The last pass is left in the
+    #space for display_space() and parents holds the path
+    #Returns the path cost, or -1 if the goal cannot be reached
+    def ida_star(self, start, goal):
+        width = self.width
+        height = self.height
+        solid = self.solid
+        costs = self.costs
+
+        start_index = self.index_of(start[0], start[1])
+        goal_index = self.index_of(goal[0], goal[1])
+
+        #Whether a node is on the current path, to avoid cycles
+        on_path = bytearray(width * height)
+
+        threshold = self.cost_bound(start_index, goal_index)
+        self.expansions = 0
+
+        while True:
+            self.reset_space()
+            self.step_counter = 0
+            next_threshold = -1
+
+            #Mark the start as visited
+            self.generation[start_index] = self.current_generation
+            self.state[start_index] = 2
+            self.visited_on[start_index] = self.step_counter
+            self.depths[start_index] = 0
+            costs[start_index] = 0
+            self.parents[start_index] = -1
+            self.step_counter += 1
+
+            if (start_index == goal_index):
+                return 0
+
+            #Stack of [index, cost, next move to try]
+            stack = [[start_index, 0, 0]]
+            on_path[start_index] = 1
+
+            while stack:
+                frame = stack[-1]
+                index, cost, move = frame
+
+                #All neighbors tried, backtrack
+                if (move == 4):
+                    on_path[index] = 0
+                    stack.pop()
+                    continue
+
+                if (move == 0):
+                    self.expansions += 1
+
+                frame[2] = move + 1
+                x = index % width + MOVES[move][0]
+                y = index // width + MOVES[move][1]
+
+                #If out of bounds, a wall or already on the path
+                if (x < 0 or x >= width or y < 0 or y >= height):
+                    continue
+
+                next_index = y * width + x
+
+                if (solid[next_index] or on_path[next_index]):
+                    continue
+
+                next_cost = cost + MOVES[move][2]
+                f = next_cost + self.cost_bound(next_index, goal_index)
+
+                #Over the threshold, remember the smallest f for the next pass
+                if (f > threshold):
+                    if (next_threshold == -1 or f < next_threshold):
+                        next_threshold = f
+                    continue
+
+                #Already reached this pass at no greater cost, everything below it
+                #within the threshold has been searched from there
+                if (self.get_state(next_index) != 0 and next_cost >= costs[next_index]):
+                    continue
+
+                #Mark the node as visited the first time this pass reaches it,
+                #or when it is reached by a cheaper path
+                if (self.get_state(next_index) == 0):
+                    self.visited_on[next_index] = self.step_counter
+                    self.step_counter += 1
+
+                self.generation[next_index] = self.current_generation
+                self.state[next_index] = 2
+                self.depths[next_index] = len(stack)
+                costs[next_index] = next_cost
+                self.parents[next_index] = index
+
+                if (next_index == goal_index):
+                    for frame in stack:
+                        on_path[frame[0]] = 0
+
+                    return next_cost
+
+                on_path[next_index] = 1
+                stack.append([next_index, next_cost, 0])
+
+            #Nothing over the threshold left, goal cannot be reached
+            if (next_threshold == -1):
+                return -1
+
+            threshold = next_threshold
+
+#Wavefront engine over the same grid as IDSSearch. Instead of expanding one
+#node at a time it grows whole layers at once with array operations on a
+#boolean wall mask, and returns the depth or path cost of every cell as a
+#(height, width) array indexed [y, x]
+class WavefrontSearch:
+
+    #Cost of cells that cannot be reached, as stored in cost maps
+    UNREACHED = np.iinfo(np.int64).max // 2
+
+    #Constructor, walls is a list of (x, y) positions. solid is an optional
+    #buffer of width * height wall flags, such as IDSSearch.solid
+    def __init__(self, width, height, walls=(), solid=None):
+        self.width = width
+        self.height = height
+
+        if solid is None:
+            self.solid = np.zeros((height, width), dtype=bool)
+        else:
+            self.solid = np.frombuffer(solid, dtype=np.uint8).reshape(height, width).astype(bool)
+
+        for wall in walls:
+            self.solid[wall[1], wall[0]] = True
 
-        #Mark state
-        self.state = 2
+        self.open = ~self.solid
 
-#Scans the given node position, adding it to the frontier
-def scan(parent, nodePos, depth, cost):
+    #Returns the cells next to any cell in mask, moving west, north, east or south
+    def neighbors(self, mask):
+        result = np.zeros_like(mask)
+        result[:, :-1] |= mask[:, 1:] #west
+        result[:-1, :] |= mask[1:, :] #north
+        result[:, 1:] |= mask[:, :-1] #east
+        result[1:, :] |= mask[:-1, :] #south
+        return result
 
-    #Retrieve step counter value
-    global step_counter
+    #Returns the depth (number of moves) from start to every cell, -1 where the
+    #cell is a wall, unreachable, or deeper than max_depth
+    def depth_map(self, start, max_depth=None):
+        depths = np.full((self.height, self.width), -1, dtype=np.int64)
 
-    #If in bounds
-    if ((nodePos[0] >= 0 and nodePos[0] < width) and (nodePos[1] >= 0 and nodePos[1] < height)):
+        if self.solid[start[1], start[0]]:
+            return depths
 
-        #Get the node from the position
-        node = space[nodePos[1]][nodePos[0]]
+        frontier = np.zeros((self.height, self.width), dtype=bool)
+        frontier[start[1], start[0]] = True
+        reached = frontier.copy()
+        depth = 0
 
-        #If the node isn't a wall and has not been scanned
-        if ((not node.solid) and node.state == 0):
-                
-            #Mark the node as scanned and add to the queue
-            node.scan(parent, depth, cost, step_counter)
-            q.put(node)
+        while frontier.any():
+            depths[frontier] = depth
 
-            #Increment the step counter
-            step_counter += 1
-    
+            if max_depth is not None and depth >= max_depth:
+                break
 
-#Visits the given node, adding new neighbors to the frontier
-def visit(node):
+            #Next layer is every open, unreached neighbor of this layer
+            frontier = self.neighbors(frontier) & self.open & ~reached
+            reached |= frontier
+            depth += 1
 
-    #Mark the node as visited
-    node.visit()
+        return depths
+
+    #Returns a boolean mask of the cells reachable from start within k moves
+    def reachable(self, start, k):
+        return self.depth_map(start, k) >= 0
+
+    #Returns the cheapest path cost from start to every cell with moves costing
+    #2 west, 3 north, 2 east and 1 south (UNREACHED where there is no path).
+    #Every round relaxes all moves of all cells at once, until nothing changes
+    def cost_map(self, start):
+        costs = np.full((self.height, self.width), self.UNREACHED, dtype=np.int64)
 
-    #If not at depth limit
-    if (node.depth < depth_limit):
+        if self.solid[start[1], start[0]]:
+            return costs
 
-        #Scan neighbors
-        scan(node, [node.pos[0]-1, node.pos[1]], node.depth+1, node.cost+2)
-        scan(node, [node.pos[0], node.pos[1]-1], node.depth+1, node.cost+3)
-        scan(node, [node.pos[0]+1, node.pos[1]], node.depth+1, node.cost+2)
-        scan(node, [node.pos[0], node.pos[1]+1], node.depth+1, node.cost+1)
+        costs[start[1], start[0]] = 0
+        blocked = self.solid
 
-#-------------------------------------------------------------------------------
+        while True:
+            new_costs = costs.copy()
+            np.minimum(new_costs[:, :-1], costs[:, 1:] + 2, out=new_costs[:, :-1]) #west
+            np.minimum(new_costs[:-1, :], costs[1:, :] + 3, out=new_costs[:-1, :]) #north
+            np.minimum(new_costs[:, 1:], costs[:, :-1] + 2, out=new_costs[:, 1:]) #east
+            np.minimum(new_costs[1:, :], costs[:-1, :] + 1, out=new_costs[1:, :]) #south
+            new_costs[blocked] = self.UNREACHED
 
-#Initializing the space
-width = 5
-height = 6
-space = [[Node(False, i, j) for i in range(width)] for j in range(height)]
+            if np.array_equal(new_costs, costs):
+                return costs
 
-#Create walls
-space[1][1].solid = True
-space[2][1].solid = True
-space[3][1].solid = True
-space[4][1].solid = True
-space[1][2].solid = True
-space[3][2].solid = True
+            costs = new_costs
 
-#Starting coordinates
-start = [0, 3]
+#Engine used by a worker process of run_parallel()
+_worker_search = None
+_worker_memory = []
 
-#Initialize search
-depth_limit = 1
-depth_increment = 1
-max_depth = 9
+#Runs in each worker process, attaches to the shared walls and depth bounds
+def _init_subtree_worker(solid_name, bounds_name, width, height):
+    global _worker_search
 
-#Continue until all nodes traversed
-while (depth_limit <= max_depth):
+    size = width * height
+    solid_memory = shared_memory.SharedMemory(name=solid_name)
+    bounds_memory = shared_memory.SharedMemory(name=bounds_name)
+
+    #Keep the blocks open for the life of the worker
+    _worker_memory.extend((solid_memory, bounds_memory))
 
-    #Initialize step counter
-    step_counter = 0
-    
-    #Initialize queue with start position
-    q = queue.LifoQueue()
-    scan(None, start, 0, 0)
+    _worker_search = IDSSearch(width, height, solid=solid_memory.buf[:size])
+    _worker_search.depth_bounds = bounds_memory.buf[:size * 4].cast('i')
 
-    #Until depth is fully traversed
-    while (not q.empty()):
+#Searches one subtree in a worker process, root is the argument tuple of
+#IDSSearch.run_subtree()
+def _subtree_worker(root):
+    return _worker_search.run_subtree(*root)
 
-        #Get the next node
-        node = q.get()
+#-------------------------------------------------------------------------------
 
-        #Visit the node
-        visit(node)
+if __name__ == "__main__":
 
-    #Display pass results
-    display_space()
+    #Initializing the space and creating walls
+    search = IDSSearch(5, 6, [(1, 1), (1, 2), (1, 3), (1, 4), (2, 1), (2, 3)])
 
-    #Increment depth limit
-    depth_limit += depth_increment
+    #Starting coordinates
+    start = [0, 3]
 
-    #Reset the space
-    reset_space()
+    #When set, run IDA* to goal instead of the depth passes
+    use_ida_star = False
+    goal = [2, 2]
 
+    if (use_ida_star):
+        print("IDA* path cost: " + str(search.ida_star(start, goal)))
+        search.display_space()
 
+    #Depth passes from depth 1 to 9, set resume to continue each pass from
+    #where the previous one stopped, or use run_parallel() to spread each pass
+    #over all cores
+    else:
+        search.run(start, 9, 1, resume=False, display=True)
@@ -0,0 +1,177 @@
+#Tests for P1_A-STAR_ALEXANDER_ROSATI_AND_ISAAC_HAMPSHIRE.py
+#Run with 'python3 -m pytest P1'
+import heapq
+import importlib.util
+import os
+import random
+
+#The file name has a dash in it, so it is loaded from its path
+spec = importlib.util.spec_from_file_location(
+    "P1_A_STAR", os.path.join(os.path.dirname(__file__), "P1_A-STAR_ALEXANDER_ROSATI_AND_ISAAC_HAMPSHIRE.py"))
+astar = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(astar)
+
+#Maze of size width x height where each cell is an obstacle with probability p
+def random_maze(width, height, p, seed):
+    rng = random.Random(seed)
+    return astar.Maze([[1 if rng.random() < p else 0 for _ in range(width)] for _ in range(height)])
+
+#Open (x, y) positions of maze
+def open_positions(maze):
+    return [(x, y) for y in range(maze.height) for x in range(maze.width)
+            if not maze.cells[maze.cell_id((x, y))]]
+
+#Cost of the cheapest path from start to goal by plain dijkstra over the
+#cells of maze, or None if there is none
+def dijkstra_cost(maze, start, goal):
+    start_cell = maze.cell_id(start)
+    goal_cell = maze.cell_id(goal)
+
+    if maze.cells[start_cell] or maze.cells[goal_cell]:
+        return None
+
+    dist = {start_cell: 0}
+    heap = [(0, start_cell)]
+
+    while heap:
+        d, cell = heapq.heappop(heap)
+
+        if cell == goal_cell:
+            return d
+
+        if d > dist[cell]:
+            continue
+
+        for offset, cost in maze.edges:
+            next_cell = cell + offset
+
+            if not maze.cells[next_cell] and d + cost < dist.get(next_cell, d + cost + 1):
+                dist[next_cell] = d + cost
+                heapq.heappush(heap, (d + cost, next_cell))
+
+    return None
+
+#Path must go from start to goal over open cells with single moves, returns
+#what it costs
+def path_cost(maze, path, start, goal):
+    move_costs = dict(maze.edges)
+    assert path[0] == start and path[-1] == goal
+    cost = 0
+
+    for position, next_position in zip(path, path[1:]):
+        offset = maze.cell_id(next_position) - maze.cell_id(position)
+        assert not maze.cells[maze.cell_id(next_position)]
+        cost += move_costs[offset]
+
+    return cost
+
+#Random (width, height, p) for a small maze, including single rows and columns
+def random_shape(rng):
+    return (rng.randint(1, 30), rng.randint(1, 30), rng.choice([0, 0.1, 0.25, 0.4]))
+
+def test_bidirectional_matches_dijkstra():
+    rng = random.Random(8)
+
+    for seed in range(40):
+        width, height, p = random_shape(rng)
+        maze = random_maze(width, height, p, seed)
+        positions = open_positions(maze)
+
+        for _ in range(20 if positions else 0):
+            start = rng.choice(positions)
+            goal = rng.choice(positions)
+            expected = dijkstra_cost(maze, start, goal)
+            result = astar.bidirectional_search(maze, start, goal)
+
+            if expected is None:
+                assert result.path is None
+            else:
+                assert result.cost == expected
+                assert path_cost(maze, result.path, start, goal) == expected
+
+#The planner keeps its search between calls, so after every batch of obstacle
+#changes and every move of the agent it must still agree with a fresh dijkstra
+def test_incremental_planner_matches_dijkstra():
+    rng = random.Random(9)
+
+    for seed in range(20):
+        maze = random_maze(25, 20, 0.25, seed)
+        positions = open_positions(maze)
+        agent = rng.choice(positions)
+        goal = rng.choice(positions)
+        planner = astar.IncrementalPlanner(maze, agent, goal)
+
+        for _ in range(15):
+            changes = []
+
+            for _ in range(rng.randint(1, 8)):
+                position = (rng.randrange(maze.width), rng.randrange(maze.height))
+
+                if position not in (agent, goal):
+                    changes.append((position, rng.random() < 0.6))
+
+            planner.update_obstacles(changes)
+            expected = dijkstra_cost(maze, agent, goal)
+            result = planner.plan()
+
+            if expected is None:
+                assert result is None
+                continue
+
+            path, cost = result
+            assert cost == expected
+            assert path_cost(maze, path, agent, goal) == expected
+
+            #Walk a few steps along the plan
+            agent = path[min(len(path) - 1, rng.randint(1, 4))]
+            planner.move_start(agent)
+
+#Hierarchical paths are near-optimal, so only check that a path is found
+#exactly when one exists and that it really costs what is reported
+def test_hierarchical_finds_path_exactly_when_one_exists():
+    rng = random.Random(10)
+
+    for seed in range(30):
+        width, height, p = random_shape(rng)
+        maze = random_maze(width, height, p, seed)
+        positions = open_positions(maze)
+
+        for lazy in (True, False):
+            hierarchy = astar.HierarchicalMaze(maze, cluster_size=rng.randint(2, 10), lazy=lazy)
+
+            for _ in range(15 if positions else 0):
+                start = rng.choice(positions)
+                goal = rng.choice(positions)
+                expected = dijkstra_cost(maze, start, goal)
+                result = hierarchy.search(start, goal)
+
+                if expected is None:
+                    assert result is None
+                    continue
+
+                path, cost = result
+                assert path_cost(maze, path, start, goal) == cost
+                assert cost >= expected
+                assert hierarchy.search(start, goal, refine=False)[1] == cost
+
+#Landmarks must come from the largest group of open cells, even when the first
+#open cell is in a small sealed pocket, so ALT expands fewer cells than the
+#modif_manhattan_dist fallback
+def test_landmarks_beat_manhattan_with_pockets():
+    maze = random_maze(300, 300, 0.3, 1)
+    cache = astar.HeuristicCache(maze, num_landmarks=8, promote_after=10**9)
+    rng = random.Random(2)
+    positions = open_positions(maze)
+    manhattan_expanded = 0
+    alt_expanded = 0
+
+    for _ in range(20):
+        start = rng.choice(positions)
+        goal = rng.choice(positions)
+        plain = astar.a_star_search(maze, start, goal)
+        alt = astar.a_star_search(maze, start, goal, heuristic=cache.heuristic(goal))
+        assert alt.cost == plain.cost
+        manhattan_expanded += plain.expanded
+        alt_expanded += alt.expanded
+
+    assert alt_expanded < 0.75 * manhattan_expanded
@@ -0,0 +1,68 @@
+#Tests for the IDA* mode of P1_IDS_ALEXANDER_ROSATI_AND_ISAAC_HAMPSHIRE.py
+#Run with 'python3 -m pytest P1'
+import random
+
+from P1_IDS_ALEXANDER_ROSATI_AND_ISAAC_HAMPSHIRE import IDSSearch, WavefrontSearch
+
+#Walls in column wall_x on every row but the last, so the path has to detour
+#down to the gap at the bottom and back up
+def walled_grid(size, wall_x):
+    return [(wall_x, y) for y in range(size - 1)]
+
+#IDA* cost must match the cheapest cost from the wavefront cost map
+def check_cost(width, height, walls, start, goal):
+    search = IDSSearch(width, height, walls)
+    cost = search.ida_star(start, goal)
+    expected = WavefrontSearch(width, height, walls).cost_map(start)[goal[1], goal[0]]
+
+    if (expected == WavefrontSearch.UNREACHED):
+        assert cost == -1
+    else:
+        assert cost == expected
+
+    return search
+
+#A wall forcing a detour used to make every pass walk all simple paths under
+#the threshold, tens of millions of expansions on 12x12
+def test_ida_star_walled_grid():
+    for size in (10, 12, 14, 20):
+        walls = walled_grid(size, size // 2)
+        search = check_cost(size, size, walls, [0, 0], [size - 1, 0])
+        assert search.expansions < 50 * size * size
+
+def test_ida_star_random_grids():
+    rng = random.Random(13)
+
+    for _ in range(200):
+        width = rng.randint(2, 9)
+        height = rng.randint(2, 9)
+        cells = [(x, y) for x in range(width) for y in range(height)]
+        start, goal = rng.sample(cells, 2)
+        walls = [cell for cell in cells if cell not in (start, goal) and rng.random() < 0.25]
+        check_cost(width, height, walls, list(start), list(goal))
+
+#Positions of the nodes the last pass of search marked
+def marked_positions(search):
+    return {(index % search.width, index // search.width)
+            for index in range(search.width * search.height) if search.get_state(index) != 0}
+
+#A resumed search with steps of at most 2 marks exactly the nodes within the
+#depth limit of start, the same set as the wavefront depth map
+def test_resume_marks_breadth_first_set():
+    rng = random.Random(12)
+
+    for _ in range(100):
+        width = rng.randint(2, 9)
+        height = rng.randint(2, 9)
+        cells = [(x, y) for x in range(width) for y in range(height)]
+        start = rng.choice(cells)
+        walls = [cell for cell in cells if cell != start and rng.random() < 0.3]
+        depths = WavefrontSearch(width, height, walls).depth_map(start)
+
+        for increment in (1, 2):
+            for first_depth in (1, 2):
+                for max_depth in range(first_depth, 14, increment):
+                    search = IDSSearch(width, height, walls)
+                    search.run(list(start), max_depth, increment, first_depth, resume=True)
+                    expected = {(x, y) for (x, y) in cells if 0 <= depths[y, x] <= max_depth}
+                    assert marked_positions(search) == expected
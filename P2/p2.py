@@ -7,6 +7,7 @@
 # OS: Ubuntu
 
 # imports #######################################################################
+import sys
 import numpy as np # 'pip install numpy' to install this module
 
 # global vars #######################################################################
@@ -27,6 +28,8 @@ FAIL_TO_DETECT_OPEN = 0.2 # bot senses empty space and there isn't one
 WEST = 0 # these are here to
 NORTH = 1 # make things easier to read
 
+ACTION_NAMES = 'WNES' # letter of each action, used when reading records
+
 agenda = [[0, 0, 0, 0],  # Z1
           WEST,          # First Action
           [1, 1, 0, 1],  # Z2
@@ -38,6 +41,10 @@ agenda_item = 'evidence'
 PROB_GO_FORWARD = 0.7
 PROB_DRIFT = 0.15
 
+# beliefs are vectors with one probability per open space (see to_grid), set this
+# to np.float32 to halve their memory on big maps
+belief_type = np.float64
+
 # use list comprehension to get open spaces in maze
 open_spaces = [(x, y) for x in range(6) for y in range(5) if (x, y) not in obstacles]
 
@@ -61,9 +68,13 @@ def transition(curr_state, action):
     else:
         return new_state # new location
 
-# returns P(Zi = evidence | Si = state)
-def evidence_cond_prob(evidence, state):
-    prob = 1.0 # probability we return
+# packs a w, n, e, s list of 0/1 values into a number from 0 to 15
+# (w is bit 0, n is bit 1, e is bit 2, s is bit 3)
+def pack_directions(values):
+    return values[0] | (values[1] << 1) | (values[2] << 2) | (values[3] << 3)
+
+# returns the packed w, n, e, s walls around state (see pack_directions)
+def wall_signature(state):
     is_wall = [] # is wall to w, n, e, s
 
     # iterate through directions in order of w, n, e, s
@@ -72,19 +83,40 @@ def evidence_cond_prob(evidence, state):
             is_wall.append(1) # wall in that direction
         else: # didn't hit wall
             is_wall.append(0) # open space in that direction
-    
-    # iterate thought directions in order of w, n, e, s
-    for dir in range(4):
-        if is_wall[dir] == 1 and evidence[dir] == 1: # correctly detected wall
-            prob *= DETECT_WALL # mulitiply by factor of 0.75
-        elif is_wall[dir] == 0 and evidence[dir] == 0: # correctly detect open space
-            prob *= DETECT_OPEN # multiply by factor of 0.8
-        elif is_wall[dir] == 0 and evidence[dir] == 1: # incorrectly detect wall
-            prob *= FAIL_TO_DETECT_OPEN # multiply by factor of 0.2
-        elif is_wall[dir] == 1 and evidence[dir] == 0: # incorrectly detect open space
-            prob *= FAIL_TO_DETECT_WALL # multiply by factor of 0.25
-    
-    return prob # return result
+
+    return pack_directions(is_wall)
+
+# returns a 16x16 table where table[evidence code, wall signature] is
+# P(Zi = evidence | walls around Si), computed once for the sensor model
+def build_likelihood_table():
+    table = np.zeros((16, 16), np.float64)
+    for code in range(16):
+        evidence = [(code >> dir) & 1 for dir in range(4)]
+        for signature in range(16):
+            is_wall = [(signature >> dir) & 1 for dir in range(4)]
+            prob = 1.0 # probability we store
+
+            # iterate thought directions in order of w, n, e, s
+            for dir in range(4):
+                if is_wall[dir] == 1 and evidence[dir] == 1: # correctly detected wall
+                    prob *= DETECT_WALL # mulitiply by factor of 0.75
+                elif is_wall[dir] == 0 and evidence[dir] == 0: # correctly detect open space
+                    prob *= DETECT_OPEN # multiply by factor of 0.8
+                elif is_wall[dir] == 0 and evidence[dir] == 1: # incorrectly detect wall
+                    prob *= FAIL_TO_DETECT_OPEN # multiply by factor of 0.2
+                elif is_wall[dir] == 1 and evidence[dir] == 0: # incorrectly detect open space
+                    prob *= FAIL_TO_DETECT_WALL # multiply by factor of 0.25
+
+            table[code, signature] = prob
+    return table
+
+# returns P(Zi = evidence | Si = state)
+def evidence_cond_prob(evidence, state):
+    return likelihood_table[pack_directions(evidence), wall_signatures[state[0], state[1]]]
+
+# returns P(Zi = evidence | Si) for every open space, in open_spaces order
+def evidence_likelihood(evidence):
+    return likelihood_table[pack_directions(evidence)][open_signatures].astype(belief_type, copy=False)
 
 # returns P(Si+1 | Si, a)
 def transitional_prob(state, action):
@@ -102,9 +134,62 @@ def transitional_prob(state, action):
             (state_counter_clockwise, PROB_DRIFT), # PROB_DRIFT = 0.15
             (state_clockwise, PROB_DRIFT)) #PROB_DRIFT = 0.15
 
+# index of each open space in open_spaces, -1 for obstacles
+state_index = np.full((height, width), -1, np.int64)
+for i, os in enumerate(open_spaces):
+    state_index[os[0], os[1]] = i
+
+# rows and columns of the open spaces, to scatter beliefs back into the grid
+open_rows = np.array([os[0] for os in open_spaces], np.int64)
+open_cols = np.array([os[1] for os in open_spaces], np.int64)
+
+# returns a belief where every open space is equally likely
+def uniform_belief():
+    return np.full(len(open_spaces), 1.0 / len(open_spaces), belief_type)
+
+# returns the belief (or a stack of beliefs) as a height x width grid with 0 for
+# obstacles
+def to_grid(belief):
+    grid = np.zeros(belief.shape[:-1] + (height, width), belief.dtype)
+    grid[..., open_rows, open_cols] = belief
+    return grid
+
+# wall signature of each cell (0 for obstacles) and the sensor model table,
+# computed once for the map
+wall_signatures = np.zeros((height, width), np.int64)
+for os in open_spaces:
+    wall_signatures[os[0], os[1]] = wall_signature(os)
+open_signatures = wall_signatures[open_rows, open_cols]
+likelihood_table = build_likelihood_table()
+
+# compiled motion model for each action and probability type, keyed by
+# (action, dtype), see transition_operator
+transition_operators = {}
+
+# returns the motion model for action as a sparse matrix over open space indices
+# in coordinate form: (dst, src, prob) arrays with one entry per transition, so
+# P(Si+1 = dst | Si = src, action) = prob. prob has type dtype, belief_type when
+# it is None. built from transitional_prob the first time an action is used
+# with that type
+def transition_operator(action, dtype=None):
+    dtype = np.dtype(belief_type if dtype is None else dtype)
+    if (action, dtype) not in transition_operators:
+        dst = []
+        src = []
+        probs = []
+        for i, os in enumerate(open_spaces): # same order as the python loops used
+            for (state, prob) in transitional_prob(os, action):
+                dst.append(state_index[state[0], state[1]])
+                src.append(i)
+                probs.append(prob)
+        transition_operators[action, dtype] = (np.array(dst, np.int64),
+                                               np.array(src, np.int64),
+                                               np.array(probs, dtype))
+    return transition_operators[action, dtype]
+
 # displays distribution
 def display(dist):
-    for row in dist:
+    for row in to_grid(dist):
         for cell in row:
             if cell < 1e-8:
                 print('####    ', end='')
@@ -115,107 +200,436 @@ def display(dist):
                     print("{prob:.2f}    ".format(prob=cell*100), end='')
         print()
 
-# sensing update
+# sensing update, returns the scaling coefficient P(Zi = evidence | Z1,...,Zi-1)
+# as a float64 even when belief_type is np.float32
+# if the evidence is impossible everywhere the coefficient is 0 and dist is left
+# as it was instead of dividing by zero
 def filtering(dist, evidence):
-    for os in open_spaces: # iterate through open spaces
-        dist[os[0], os[1]] *= evidence_cond_prob(evidence, os) # calculate p1,...,p24
-    dist /= np.sum(dist) # calculate p1/(p1+...+p24),...,p24/(p1+...+p24)
+    # calculate p1,...,p24 with one lookup into the sensor model table
+    weighted = dist * evidence_likelihood(evidence)
+    scale = np.sum(weighted, dtype=np.float64) # p1+...+p24, in float64 whatever belief_type is
+    if scale > 0: # otherwise ignore the evidence
+        np.divide(weighted, scale, out=dist) # calculate p1/(p1+...+p24),...,p24/(p1+...+p24)
+    return scale
 
 # motion update
 def prediction(dist, action):
-    new_dist = np.zeros((height, width), np.float64) # numpy array of zeros
-    for os in open_spaces: # iterate though open spaces
-        for (state, prob) in transitional_prob(os, action): # iterate though spaces we can travel to
-            # add on term for total probability
-            # dist[os[0], os[1]] is a result from the last round of filtering
-            new_dist[state[0], state[1]] += prob * dist[os[0], os[1]] 
-    return new_dist # update distribution
+    dst, src, prob = transition_operator(action)
+    # new_dist[dst] += prob * dist[src] for every transition, as one product
+    # dist is a result from the last round of filtering
+    new_dist = np.bincount(dst, weights=prob * dist[src], minlength=len(open_spaces))
+    return new_dist.astype(belief_type, copy=False) # update distribution
 
 # backward pass
 def backward(dist, evidence, action):
-    new_dist = np.zeros((height, width), np.float64)
-    for os in open_spaces:
-        for (state, prob) in transitional_prob(os, action):
-            # add on term for total probability
-            # value += recursive probability * evidence prob * transition prob
-            new_dist[os[0], os[1]] += dist[state[0], state[1]] * evidence_cond_prob(evidence, state) * prob
+    dst, src, prob = transition_operator(action)
+    # evidence prob of every open space
+    likelihood = evidence_likelihood(evidence)
+    # value[src] += recursive probability * evidence prob * transition prob,
+    # the transposed product of the motion model
+    new_dist = np.bincount(src, weights=prob * (dist * likelihood)[dst], minlength=len(open_spaces))
+    if np.sum(new_dist) == 0: # evidence impossible, ignore it like filtering does
+        new_dist = np.bincount(src, weights=prob * dist[dst], minlength=len(open_spaces))
+    new_dist = new_dist.astype(belief_type, copy=False)
     # normalize
     new_dist /= np.sum(new_dist)
     return new_dist
 
-# script starts here ###################################################################
-#
-# initialize distribution
-dist = []
-
-# forward pass distributions
-forward_evidence = []
-forward_dist = []
-
-# backward pass probabilities
-backward_dist = [np.ones((height, width), np.float64)]
-
-# actions
-actions = []
+# scaled forward-backward over evidence[0..T-1] with actions[i] taken between
+# evidence[i] and evidence[i+1], starting from the distribution dist. every
+# message is normalized as it goes, so it never underflows however long the
+# sequence is, and the normalizing coefficients give the log-likelihood
+# log P(Z1,...,ZT) = log c1 + ... + log cT. returns (filtered, smoothed,
+# log_likelihood), where log_likelihood is -inf if some evidence was impossible
+def forward_backward(dist, evidence, actions):
+    filtered = []
+    log_likelihood = 0.0
+    dist = dist.copy()
+
+    # forward pass
+    for i in range(len(evidence)):
+        if i > 0:
+            dist = prediction(dist, actions[i-1]) # motion update
+        scale = filtering(dist, evidence[i]) # sensing update
+        log_likelihood += float(np.log(scale)) if scale > 0 else -np.inf
+        filtered.append(dist.copy())
+
+    # backward pass, last smoothed distribution is the last filtered one
+    smoothed = [None] * len(evidence)
+    if len(evidence) != 0:
+        smoothed[-1] = filtered[-1]
+    backward_message = np.ones(len(open_spaces), belief_type)
+    for i in range(len(evidence)-2, -1, -1):
+        backward_message = backward(backward_message, evidence[i+1], actions[i])
+        smoothed[i] = smooth(filtered[i], backward_message)
+
+    return filtered, smoothed, log_likelihood
+
+# multiply forward and backward terms and normalize, falling back to the
+# forward term when the two disagree completely (impossible sequence)
+def smooth(forward_message, backward_message):
+    smoothed = np.multiply(forward_message, backward_message)
+    total = np.sum(smoothed)
+    return smoothed / total if total > 0 else forward_message
+
+# smoothing like forward_backward, but only every k-th filtered distribution is
+# kept from the forward pass (k defaults to sqrt(T)). the backward sweep goes one
+# segment of k steps at a time, recomputing that segment's filtered
+# distributions from its checkpoint, so memory is O(sqrt(T)) distributions and
+# the results are the same. yields (i, smoothed distribution) for i = T-1,...,0
+def checkpoint_smoothing(dist, evidence, actions, k=None):
+    if len(evidence) == 0:
+        return
+    if k is None:
+        k = max(1, int(np.ceil(np.sqrt(len(evidence)))))
+
+    # forward pass keeping every k-th distribution
+    checkpoints = []
+    dist = dist.copy()
+    for i in range(len(evidence)):
+        if i > 0:
+            dist = prediction(dist, actions[i-1]) # motion update
+        filtering(dist, evidence[i]) # sensing update
+        if i % k == 0:
+            checkpoints.append(dist.copy())
+
+    # backward pass, newest segment first
+    backward_message = np.ones(len(open_spaces), belief_type)
+    for c in range(len(checkpoints)-1, -1, -1):
+        start = c * k
+        end = min(start + k, len(evidence))
+
+        # recompute the filtered distributions of the segment
+        segment = [checkpoints[c]]
+        checkpoints[c] = None # segment holds it now
+        for i in range(start+1, end):
+            dist = prediction(segment[-1], actions[i-1])
+            filtering(dist, evidence[i])
+            segment.append(dist)
+
+        for i in range(end-1, start-1, -1):
+            if i == len(evidence) - 1: # last smoothed distribution is the filtered one
+                yield i, segment[i-start]
+            else:
+                backward_message = backward(backward_message, evidence[i+1], actions[i])
+                yield i, smooth(segment[i-start], backward_message)
 
-# create list
-for _ in range(6):
-    dist.append([0.0, 0.0, 0.0, 0.0, 0.0]) # append list to list
+# streaming ########################################################################
+#
+# records are (action, evidence) pairs where action is the action taken before
+# the evidence was sensed, None for the first record
+
+# reads records from lines laid out like agenda: one line per evidence (four 0/1
+# values for w, n, e, s, e.g. '1 1 0 1' or '1101') with one line holding the
+# action (W, N, E, S or 0-3) between each pair. blank lines and '#' comments are
+# skipped. lines can be a file or sys.stdin, nothing is read ahead. raises
+# ValueError on a line that isn't an action or evidence, or is out of order
+def read_records(lines):
+    action = None
+    first = True
+    for line in lines:
+        line = ''.join(line.split('#')[0].split()) # drop comments and spaces
+        if line == '':
+            continue
+        if len(line) == 1: # action
+            if line not in ACTION_NAMES and line not in '0123':
+                raise ValueError('action ' + line + ' is not W, N, E, S or 0-3')
+            if first or action is not None:
+                raise ValueError('action ' + line + ' is not between two evidence lines')
+            action = ACTION_NAMES.index(line) if line in ACTION_NAMES else int(line)
+        else: # evidence
+            if len(line) != 4 or line.strip('01') != '':
+                raise ValueError('evidence ' + line + ' is not four 0/1 values')
+            if not first and action is None:
+                raise ValueError('evidence ' + line + ' does not follow an action')
+            yield action, [int(c) for c in line]
+            action = None
+            first = False
+
+# fixed-lag smoothing over records, starting from the distribution dist. yields
+# ('filtered', t, dist) as soon as record t is read and ('smoothed', t - lag,
+# dist) once lag more records have been read. only the last lag + 1 filtered
+# distributions are kept in a ring buffer, so every record costs the same
+# whatever the length of the stream. when the records run out the last
+# distributions are smoothed with the evidence there is
+def fixed_lag_smoothing(dist, records, lag):
+    size = lag + 1
+    filtered = np.zeros((size, len(open_spaces)), belief_type) # ring buffers
+    evidence_ring = [None] * size
+    action_ring = [None] * size
+    dist = dist.copy()
+    t = -1
+    for action, evidence in records:
+        t += 1
+        if t > 0:
+            dist = prediction(dist, action) # motion update
+        filtering(dist, evidence) # sensing update
+        filtered[t % size] = dist
+        evidence_ring[t % size] = evidence
+        action_ring[t % size] = action
+        yield 'filtered', t, dist.copy()
+
+        if t >= lag: # smooth t - lag using the lag records after it
+            backward_message = np.ones(len(open_spaces), belief_type)
+            for j in range(t, t - lag, -1):
+                backward_message = backward(backward_message, evidence_ring[j % size], action_ring[j % size])
+            yield 'smoothed', t - lag, smooth(filtered[(t - lag) % size], backward_message)
+
+    # smooth what is left in the buffer, one backward sweep for all of it
+    low = max(t - lag + 1, 0)
+    smoothed = []
+    backward_message = np.ones(len(open_spaces), belief_type)
+    for i in range(t, low - 1, -1):
+        if i == t: # last smoothed distribution is the filtered one
+            smoothed.append(filtered[i % size].copy())
+        else:
+            backward_message = backward(backward_message, evidence_ring[(i+1) % size], action_ring[(i+1) % size])
+            smoothed.append(smooth(filtered[i % size], backward_message))
+    smoothed.reverse()
+    for i, smoothed_dist in enumerate(smoothed):
+        yield 'smoothed', low + i, smoothed_dist
+
+# runs fixed-lag smoothing over the records in the file at path ('-' for stdin),
+# printing each distribution as it comes out
+def run_stream(path, lag):
+    lines = sys.stdin if path == '-' else open(path)
+    for (kind, t, stream_dist) in fixed_lag_smoothing(uniform_belief(), read_records(lines), lag):
+        if kind == 'filtered':
+            print('Filtering at Step ' + str(t+1))
+        else:
+            print('Smoothed Position ' + str(t+1))
+        display(stream_dist)
+        print()
+        sys.stdout.flush()
+    if lines is not sys.stdin:
+        lines.close()
 
-dist = np.array(dist) # create numpy array
-initial_prob = 1.0 / len(open_spaces) # each open space is equally likely
+# viterbi decoding ################################################################
+#
+# finds the most likely sequence of states instead of one distribution per step.
+# works in log space so long sequences don't underflow, with back-pointers
+# stored as small integer arrays over open space indices
+
+# integer type big enough to hold an open space index
+index_type = np.int16 if len(open_spaces) < 2**15 else np.int32
+
+# log of the sensor model table, impossible readings are -inf
+with np.errstate(divide='ignore'):
+    log_likelihood_table = np.log(likelihood_table)
+
+# incoming transitions of each action for viterbi, see incoming_transitions
+incoming = {}
+
+# returns (src, log_prob) arrays of shape (open spaces, k) where row j lists the
+# open spaces that can move to open space j with action and the log of the
+# probability they do. transitions that land on the same space (e.g., forward
+# and drift both hitting a wall) are added together first, and rows are padded
+# with -inf
+def incoming_transitions(action):
+    if action not in incoming:
+        n = len(open_spaces)
+        dst, src, prob = transition_operator(action, np.float64)
+        # add up duplicate (src, dst) pairs
+        pairs, inverse = np.unique(dst * n + src, return_inverse=True)
+        prob = np.bincount(inverse, weights=prob)
+        dst = pairs // n
+        src = pairs % n
+        # slot of each pair within its destination row (pairs are sorted by dst)
+        first = np.searchsorted(dst, np.arange(n))
+        slot = np.arange(len(dst)) - first[dst]
+        k = np.max(slot) + 1
+        in_src = np.zeros((n, k), np.int64)
+        in_log_prob = np.full((n, k), -np.inf)
+        in_src[dst, slot] = src
+        in_log_prob[dst, slot] = np.log(prob)
+        incoming[action] = (in_src, in_log_prob)
+    return incoming[action]
+
+# returns log P(Zi = evidence | Si) for every open space
+def evidence_log_likelihood(evidence):
+    return log_likelihood_table[pack_directions(evidence)][open_signatures]
+
+# one viterbi step: returns the new log messages and, for every open space, the
+# best open space to have come from
+def viterbi_step(messages, action):
+    in_src, in_log_prob = incoming_transitions(action)
+    scores = messages[in_src] + in_log_prob
+    best = np.argmax(scores, axis=1)
+    rows = np.arange(len(open_spaces))
+    return scores[rows, best], in_src[rows, best].astype(index_type)
+
+# returns the first log messages from the starting distribution dist
+def viterbi_start(dist, evidence):
+    with np.errstate(divide='ignore'):
+        return np.log(dist, dtype=np.float64) + evidence_log_likelihood(evidence)
+
+# keeps the largest message at 0 so the values stay small, returns the amount
+# taken off (which belongs to the log probability of the path)
+def viterbi_shift(messages):
+    top = np.max(messages)
+    if np.isfinite(top):
+        messages -= top
+        return top
+    return 0.0
+
+# most likely states for evidence[0..T-1] with actions[i] taken between
+# evidence[i] and evidence[i+1], starting from the distribution dist. returns
+# (path, log_prob) where path is a list of T states and log_prob is
+# log P(path, Z1,...,ZT), -inf if the evidence can't happen
+def viterbi(dist, evidence, actions):
+    if len(evidence) == 0:
+        return [], 0.0
+    back = np.zeros((len(evidence)-1, len(open_spaces)), index_type)
+    messages = viterbi_start(dist, evidence[0])
+    log_prob = viterbi_shift(messages)
+    for i in range(1, len(evidence)):
+        messages, back[i-1] = viterbi_step(messages, actions[i-1])
+        messages += evidence_log_likelihood(evidence[i])
+        log_prob += viterbi_shift(messages)
+
+    # follow back-pointers from the best final state
+    state = np.argmax(messages)
+    log_prob += messages[state]
+    path = [state]
+    for i in range(len(evidence)-2, -1, -1):
+        state = back[i, state]
+        path.append(state)
+    path.reverse()
+    return [open_spaces[j] for j in path], log_prob
+
+# streaming viterbi over records of (action, evidence), where the first record's
+# action is None. only the last window back-pointers are kept, so the state at
+# time t - window is decided at time t by following them from the current best
+# state. yields (time, state) in order, the last window states once the records
+# run out. window must be at least 1, otherwise ValueError is raised
+def viterbi_stream(dist, records, window):
+    if window < 1:
+        raise ValueError('window ' + str(window) + ' is not at least 1')
+    back = np.zeros((window, len(open_spaces)), index_type) # ring buffer
+    t = -1
+    for action, evidence in records:
+        t += 1
+        if t == 0:
+            messages = viterbi_start(dist, evidence)
+        else:
+            messages, back[t % window] = viterbi_step(messages, action)
+            messages += evidence_log_likelihood(evidence)
+        viterbi_shift(messages)
+
+        if t >= window:
+            state = np.argmax(messages)
+            for j in range(t, t - window, -1):
+                state = back[j % window, state]
+            yield t - window, open_spaces[state]
+
+    # flush the states still in the window
+    if t >= 0:
+        low = max(t - window + 1, 0)
+        state = np.argmax(messages)
+        path = [state]
+        for j in range(t, low, -1):
+            state = back[j % window, state]
+            path.append(state)
+        path.reverse()
+        for i, state in enumerate(path):
+            yield low + i, open_spaces[state]
+
+# batched filtering ###############################################################
+#
+# the functions below track many robots on the same map at once. dists is an
+# (N, open spaces) array with one belief per robot, evidence is an (N, 4) array
+# of w, n, e, s readings and actions is a length N array of actions
+
+# returns an (N, open spaces) array where every robot is equally likely to be in
+# any open space
+def batch_uniform(n):
+    return np.full((n, len(open_spaces)), 1.0 / len(open_spaces), belief_type)
+
+# sensing update for every robot, returns the N scaling coefficients (float64). like
+# filtering, a robot whose evidence is impossible keeps its distribution
+def batch_filtering(dists, evidence):
+    evidence = np.asarray(evidence, np.int64)
+    codes = pack_directions(evidence.T) # evidence code of every robot
+    # (N, open spaces) likelihoods from the sensor model table
+    weighted = dists * likelihood_table[codes][:, open_signatures].astype(belief_type, copy=False)
+    scales = np.sum(weighted, axis=1, dtype=np.float64)
+    possible = scales > 0 # the others ignore their evidence
+    dists[possible] = weighted[possible] / scales[possible, None]
+    return scales
+
+# motion update for every robot, returns the new (N, open spaces) array
+def batch_prediction(dists, actions):
+    actions = np.asarray(actions, np.int64)
+    n = len(open_spaces)
+    new_dists = np.zeros_like(dists)
+    for action in range(4): # one product for all robots taking the same action
+        robots = np.flatnonzero(actions == action)
+        if len(robots) == 0:
+            continue
+        dst, src, prob = transition_operator(action)
+        # offset every robot's destinations so one bincount does them all
+        index = (np.arange(len(robots))[:, None] * n + dst).ravel()
+        weights = (prob * dists[robots][:, src]).ravel()
+        new_dists[robots] = np.bincount(index, weights=weights,
+                                        minlength=len(robots) * n).reshape(len(robots), n)
+    return new_dists
 
-# iterate through open spaces
-for os in open_spaces:
-    dist[os[0], os[1]] = initial_prob # put initial prob into open space
-
-# print initial distribution
-print('Initial Location Probabilities')
-display(dist)
-print()
-
-# process agenda until agenda is empty
-while len(agenda) != 0:
-    if agenda_item == 'evidence':
-        agenda_item = 'action' # process action next time
-        evidence = agenda.pop(0) # get evidence
-        filtering(dist, evidence) # sensing update
-        print('Filtering after Evidence ' + str(evidence))
-        display(dist) # display dist
-
-        # copy distribution to forward values
-        new_dist = np.zeros((height, width), np.float64)
-        for os in open_spaces:
-            new_dist[os[0], os[1]] = dist[os[0], os[1]]
-        forward_dist.append(new_dist);
-        forward_evidence.append(evidence)
-    else:
-        agenda_item = 'evidence' # process evidence next time
-        action = agenda.pop(0) # get action
-        dist = prediction(dist, action) # motion update
-        print('Prediction after Action ' + ('W' if action == 0 else 'N'))
-        display(dist) # display distribution
-
-        # store action
-        actions.append(action)
-    
-    print() # new line character
+# script starts here ###################################################################
+#
+# only runs when p2.py is run directly, so the functions above can be imported.
+# 'python3 p2.py file [lag]' smooths the records in file ('-' for stdin) with a
+# lag of 2 by default instead of running the agenda
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run_stream(sys.argv[1], int(sys.argv[2]) if len(sys.argv) > 2 else 2)
+        sys.exit(0)
 
-# for each distribution collected
-for i in range(len(forward_dist)-2, -1, -1):
+    # forward pass evidence
+    forward_evidence = []
 
-    # compute next backward distribution using following evidence and action
-    next_backward_dist = backward(backward_dist[0], forward_evidence[i+1], actions[i])
+    # actions
+    actions = []
 
-    # insert at beginning
-    backward_dist.insert(0, next_backward_dist)
+    # initialize distribution, each open space is equally likely
+    dist = uniform_belief()
 
-    # multiply with forward term and normalize
-    smooth = np.multiply(forward_dist[i],next_backward_dist)
-    smooth /= np.sum(smooth)
+    # kept for smoothing, which recomputes the forward pass from it
+    initial_dist = dist.copy()
 
-    # display smoothed value
-    print('Smoothed Position ' + str(i+1))
-    display(smooth)
+    # print initial distribution
+    print('Initial Location Probabilities')
+    display(dist)
     print()
-    
+
+    # process agenda until agenda is empty
+    while len(agenda) != 0:
+        if agenda_item == 'evidence':
+            agenda_item = 'action' # process action next time
+            evidence = agenda.pop(0) # get evidence
+            filtering(dist, evidence) # sensing update
+            print('Filtering after Evidence ' + str(evidence))
+            display(dist) # display dist
+
+            # store evidence
+            forward_evidence.append(evidence)
+        else:
+            agenda_item = 'evidence' # process evidence next time
+            action = agenda.pop(0) # get action
+            dist = prediction(dist, action) # motion update
+            print('Prediction after Action ' + ('W' if action == 0 else 'N'))
+            display(dist) # display distribution
+
+            # store action
+            actions.append(action)
+
+        print() # new line character
+
+    # for each position before the last one, newest first
+    for (i, smoothed) in checkpoint_smoothing(initial_dist, forward_evidence, actions):
+        if i == len(forward_evidence) - 1: # last one is just the filtered value
+            continue
+
+        # display smoothed value
+        print('Smoothed Position ' + str(i+1))
+        display(smoothed)
+        print()